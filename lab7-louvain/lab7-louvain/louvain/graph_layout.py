@@ -0,0 +1,105 @@
+# --------------------------- 大图社区布局（各 *_vis.py 脚本共用） -------------
+# nx.spring_layout 对全图每轮迭代都是 O(n²)，十万节点以上无法使用。这里分两步：
+#   1. 按社区划分把图凝聚成“社区图”（边权 = 社区间边权和），只对社区图做 spring_layout；
+#   2. 每个社区占一块圆形区域（面积 ∝ 社区规模），成员按度数从中心向外排成向日葵螺旋，
+#      再沿社区内部边做几轮平滑，使相连的节点靠近；全部为 NumPy 向量化运算。
+# 结果按 “图 + 划分 + 参数” 的哈希缓存为 .npz，只改绘图样式时不必重算坐标。
+# -----------------------------------------------------------------------------
+
+import hashlib                # 缓存键
+import os                     # 缓存目录、原子替换
+
+import numpy as np
+
+LAYOUT_CACHE_DIR = "backup/layout-cache"   # 布局缓存目录
+GOLDEN_ANGLE     = np.pi * (3 - np.sqrt(5))  # 向日葵螺旋的相邻夹角
+REGION_SCALE     = 0.45                     # 最大社区的半径 / 社区中心的平均间距
+
+# --------------------------- 缓存键 ------------------------------------------
+def layout_cache_key(src, dst, w, nodes, labels, **params):
+    h = hashlib.sha1()
+    for arr in (src, dst, w, nodes, labels):            # 边列表与划分的原始字节
+        h.update(np.ascontiguousarray(arr).tobytes())
+    h.update(repr(sorted(params.items())).encode())     # 布局参数不同也视为不同布局
+    return h.hexdigest()[:16]
+
+# --------------------------- 社区布局 ----------------------------------------
+def _condensed_centers(cu, cv, w, num_comm, seed, iterations):  # 社区图的 spring_layout
+    if num_comm == 1:
+        return np.zeros((1, 2))
+    import networkx as nx                               # 只对社区图使用，规模远小于原图
+    inter = cu != cv
+    lo, hi = np.minimum(cu[inter], cv[inter]), np.maximum(cu[inter], cv[inter])
+    pairs, inv = np.unique(lo * num_comm + hi, return_inverse=True)
+    pair_w = np.bincount(inv, weights=w[inter])         # 同一对社区间的边权求和
+    H = nx.Graph()
+    H.add_nodes_from(range(num_comm))
+    H.add_weighted_edges_from(zip((pairs // num_comm).tolist(), (pairs % num_comm).tolist(), pair_w.tolist()))
+    pos = nx.spring_layout(H, seed=seed, iterations=iterations, weight="weight")
+    return np.array([pos[c] for c in range(num_comm)], dtype=np.float64)
+
+def community_layout(src, dst, w, nodes, labels, seed=42, iterations=50, local_iterations=10):
+    # nodes/labels: 社区划分（顶点 id → 社区 id）；返回 (node_ids, pos)，pos[i] 为 node_ids[i] 的坐标
+    node_ids = np.union1d(nodes, np.concatenate([src, dst]))
+    n = len(node_ids)
+    lab = np.full(n, -1, dtype=np.int64)
+    lab[np.searchsorted(node_ids, nodes)] = labels
+    missing = lab < 0                                   # 划分里没有的顶点各自成一个社区
+    lab[missing] = lab.max(initial=-1) + 1 + np.arange(int(missing.sum()))
+    _, lab = np.unique(lab, return_inverse=True)        # 社区重编号为 0..C-1
+    num_comm = int(lab.max()) + 1 if n else 0
+    if n == 0:
+        return node_ids, np.empty((0, 2))
+
+    u, v = np.searchsorted(node_ids, src), np.searchsorted(node_ids, dst)
+    cu, cv = lab[u], lab[v]
+    sizes = np.bincount(lab, minlength=num_comm)
+    rng = np.random.default_rng(seed)
+
+    # -------- 1. 社区中心与区域半径 -------------------------------------------
+    centers = _condensed_centers(cu, cv, w, num_comm, seed, iterations)
+    spacing = 2.0 / np.sqrt(num_comm)                   # spring_layout 坐标范围为 [-1, 1]
+    radius  = REGION_SCALE * spacing * np.sqrt(sizes / sizes.max())
+
+    # -------- 2. 社区内向日葵螺旋：度数大的靠近中心 ----------------------------
+    degree = np.bincount(u, weights=w, minlength=n) + np.bincount(v, weights=w, minlength=n)
+    order  = np.lexsort((-degree, lab))                 # 先按社区、再按度数降序
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    lab_o  = lab[order]
+    rank   = np.arange(n) - starts[lab_o]               # 节点在本社区内的名次
+    r      = radius[lab_o] * np.sqrt((rank + 0.5) / sizes[lab_o])
+    theta  = rank * GOLDEN_ANGLE + rng.uniform(0, 2 * np.pi, num_comm)[lab_o]
+    pos = np.empty((n, 2))
+    pos[order] = centers[lab_o] + np.column_stack([r * np.cos(theta), r * np.sin(theta)])
+
+    # -------- 3. 沿社区内部边平滑，再把每个社区的离散程度拉回原值 ---------------
+    intra = cu == cv
+    iu, iv, iw = u[intra], v[intra], w[intra]
+    wsum = np.bincount(iu, weights=iw, minlength=n) + np.bincount(iv, weights=iw, minlength=n)
+    has = wsum > 0
+    spread = np.sqrt(np.bincount(lab, weights=((pos - centers[lab]) ** 2).sum(1), minlength=num_comm) / sizes)
+    for _ in range(local_iterations if has.any() else 0):
+        nbr = np.column_stack([np.bincount(iu, weights=iw * pos[iv, d], minlength=n)
+                               + np.bincount(iv, weights=iw * pos[iu, d], minlength=n) for d in (0, 1)])
+        pos[has] = 0.5 * pos[has] + 0.5 * nbr[has] / wsum[has, None]   # 向邻居加权中心移动一半
+        offset = pos - centers[lab]
+        cur = np.sqrt(np.bincount(lab, weights=(offset ** 2).sum(1), minlength=num_comm) / sizes)
+        scale = np.divide(spread, cur, out=np.ones(num_comm), where=cur > 0)
+        pos = centers[lab] + offset * scale[lab, None]  # 平滑会收缩，按社区恢复原离散程度
+    return node_ids, pos
+
+def cached_community_layout(src, dst, w, nodes, labels, cache_dir=LAYOUT_CACHE_DIR, **params):
+    # 同 community_layout；相同的图、划分与参数直接读取缓存
+    path = os.path.join(cache_dir, f"layout-{layout_cache_key(src, dst, w, nodes, labels, **params)}.npz")
+    if os.path.exists(path):
+        with np.load(path) as npz:
+            return npz["node_ids"], npz["pos"]
+
+    node_ids, pos = community_layout(src, dst, w, nodes, labels, **params)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp"                                 # 写临时文件后原子替换，避免半截缓存
+    with open(tmp, "wb") as fh:
+        np.savez(fh, node_ids=node_ids, pos=pos)
+    os.replace(tmp, path)
+    print(">> layout cached:", path)
+    return node_ids, pos
@@ -0,0 +1,76 @@
+# --------------------------- 边列表快速读取（各 louvain 脚本共用） -------------
+# 一次性用 NumPy 解析 “u v [w]” 格式的边列表，并在旁边写一个 .npz 二进制缓存，
+# 以文件大小 + 修改时间为键；之后再次运行直接读缓存，不再逐行 int()/float()。
+# -----------------------------------------------------------------------------
+
+import collections            # defaultdict 邻接表
+import os                     # 文件大小、修改时间、原子替换
+
+import numpy as np            # 批量解析与数组存储
+
+CACHE_SUFFIX = ".npz"         # 缓存文件：与边列表同目录，文件名后追加 .npz
+CACHE_FORMAT = 2              # 解析规则变化时递增，旧缓存自动失效
+
+# --------------------------- 解析与缓存 --------------------------------------
+def _file_key(path):                                    # 缓存键：(字节数, 修改时间 ns, 缓存格式)
+    st = os.stat(path)
+    return np.array([st.st_size, st.st_mtime_ns, CACHE_FORMAT], dtype=np.int64)
+
+def _parse_edge_list(path):                             # 批量解析文本边列表
+    ncols = nrows = 0
+    with open(path, "rb") as text:                      # 第一条非空行确定列数，并统计非空行数
+        for line in text:
+            if line.strip():
+                if not nrows:
+                    ncols = len(line.split())
+                nrows += 1
+    if ncols == 0:                                      # 空文件
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+
+    values = np.fromfile(path, dtype=np.float64, sep=" ")  # C 层解析全部数字（空白/换行均可分隔）
+    if len(values) != ncols * nrows:                    # 各行列数不一致：退回逐行解析，缺省权重为 1
+        with open(path) as fh:
+            rows = [line.split() for line in fh if line.strip()]
+        values = np.array([r[:2] + [r[2] if len(r) > 2 else 1.0] for r in rows], dtype=np.float64)
+        ncols = 3
+    data = values.reshape(-1, ncols)
+    src = data[:, 0].astype(np.int64)                   # 起点
+    dst = data[:, 1].astype(np.int64)                   # 终点
+    w   = data[:, 2].copy() if ncols > 2 else np.ones(len(src))  # 权重（无则为 1.0）
+    return src, dst, w
+
+def load_edge_arrays(path, use_cache=True):             # 返回 (src, dst, w) 三个等长数组
+    cache = path + CACHE_SUFFIX
+    key = _file_key(path)
+    if use_cache and os.path.exists(cache):             # 缓存存在且与源文件匹配则直接读取
+        with np.load(cache) as npz:
+            if np.array_equal(npz["key"], key):
+                return npz["src"], npz["dst"], npz["w"]
+
+    src, dst, w = _parse_edge_list(path)
+    if use_cache:                                       # 写临时文件后原子替换，避免半截缓存
+        tmp = cache + ".tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, key=key, src=src, dst=dst, w=w)
+        os.replace(tmp, cache)
+    print(">> parsed edges:", len(src))
+    return src, dst, w
+
+# --------------------------- 转换为各算法的输入 ------------------------------
+def iter_weighted_edges(src, dst, w):                   # 逐条产出 (u, v, w)，不构造中间列表
+    return zip(src.tolist(), dst.tolist(), w.tolist())
+
+def to_networkx(src, dst, w, G=None):                   # 填充 networkx 无向加权图
+    import networkx as nx                               # 仅 API 脚本与可视化脚本需要
+    if G is None:
+        G = nx.Graph()
+    G.add_nodes_from(np.unique(np.concatenate([src, dst])).tolist())
+    G.add_weighted_edges_from(iter_weighted_edges(src, dst, w))
+    return G
+
+def to_adjacency(src, dst, w):                          # 邻接字典 {u:{v:w}}，供 louvain_3_impl.Louvain
+    G = collections.defaultdict(dict)
+    for v_i, v_j, weight in iter_weighted_edges(src, dst, w):
+        G[v_i][v_j] = weight                            # 无向图：u→v
+        G[v_j][v_i] = weight                            #           v→u
+    return G
@@ -0,0 +1,116 @@
+# --------------------------- 大图栅格化绘制（各 *_vis.py 脚本共用） -----------
+# nx.draw_networkx_* 为每个节点集合、每条边创建 matplotlib 对象，百万条边时内存与耗时都不可接受。
+# 这里直接在 NumPy 像素缓冲区上累加：
+#   边  : 每条边按像素步长采样，np.bincount 累加边权密度，再按 log 密度换算透明度叠加；
+#   节点: 按社区颜色（tab20 循环）在像素上取平均色，重叠越多越不透明；
+#   可选: 社区间的边聚合为 “社区质心 ↔ 社区质心” 的一条线，线的深浅表示该社区对的边权和
+#         （交叉处取较深的一条，不叠加）。
+# 最后整幅图一次写成 PNG，不创建任何逐元素的绘图对象。
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+MAX_SAMPLES  = 20_000_000     # 每批边采样点数上限，控制峰值内存
+EDGE_COLOR   = (0.2, 0.2, 0.2)
+EDGE_ALPHA   = 0.6            # 边密度最大处的不透明度
+NODE_ALPHA   = 0.6            # 单个节点的不透明度
+AGG_COLOR    = (0.0, 0.0, 0.0)
+AGG_ALPHA    = 0.9            # 聚合边权最大处的不透明度
+MARGIN       = 0.03           # 四周留白比例
+
+def community_palette(labels):                          # 与原脚本一致：tab20 颜色按社区 id 循环，-1 为灰色
+    import matplotlib                                   # 只取颜色表
+    colors = matplotlib.colormaps["tab20"](np.arange(20))[:, :3]
+    rgb = colors[np.asarray(labels) % 20]
+    rgb[np.asarray(labels) < 0] = 0.6
+    return rgb
+
+# --------------------------- 坐标与采样 --------------------------------------
+def _to_pixels(pos, width, height):                     # 等比例缩放到画布，y 轴朝上
+    lo, hi = pos.min(0), pos.max(0)
+    span = np.maximum(hi - lo, 1e-12)
+    scale = min(width, height) * (1 - 2 * MARGIN) / span.max() if len(pos) else 1.0
+    px = (pos - (lo + hi) / 2) * scale
+    return px[:, 0] + width / 2, height / 2 - px[:, 1]
+
+def _iter_line_samples(x0, y0, x1, y1, width, height):
+    # 把一批线段按像素步长采样，分块产出 (线段下标, 一维像素下标)，只含画布内的点
+    steps = (np.maximum(np.abs(x1 - x0), np.abs(y1 - y0)) + 1).astype(np.int64)
+    ends = np.cumsum(steps)
+    bounds = np.searchsorted(ends, np.arange(MAX_SAMPLES, ends[-1] if len(ends) else 0, MAX_SAMPLES))
+    for lo, hi in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(steps)]])):
+        if lo >= hi:
+            continue
+        s = steps[lo:hi]
+        line = np.repeat(np.arange(lo, hi), s)
+        offs = np.arange(int(s.sum())) - np.repeat(np.cumsum(s) - s, s)
+        t = offs / np.maximum(s - 1, 1)[line - lo]
+        x = np.rint(x0[line] + t * (x1[line] - x0[line])).astype(np.int64)
+        y = np.rint(y0[line] + t * (y1[line] - y0[line])).astype(np.int64)
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        yield line[inside], y[inside] * width + x[inside]
+
+def _line_pixels(x0, y0, x1, y1, weights, width, height, out):
+    # 线段经过的像素累加权重到 out（长度 width*height 的一维数组）
+    for line, flat in _iter_line_samples(x0, y0, x1, y1, width, height):
+        out += np.bincount(flat, weights=weights[line], minlength=out.size)
+
+def _blend(img, alpha, color):                          # img: (H*W, 3)，按逐像素透明度叠加单一颜色
+    img *= 1 - alpha[:, None]
+    img += alpha[:, None] * np.asarray(color)
+
+# --------------------------- 绘制 --------------------------------------------
+def render_raster(path, pos, labels, u, v, w=None, width=3000, height=2000, node_radius=2,
+                  aggregate_inter=False):
+    # pos: (n, 2) 坐标；labels: (n,) 社区 id；u/v: 边两端在 pos 中的下标；w: 边权（缺省为 1）
+    import matplotlib.image                            # 只用于写 PNG
+    w = np.ones(len(u)) if w is None else np.asarray(w, dtype=np.float64)
+    labels = np.asarray(labels)
+    x, y = _to_pixels(np.asarray(pos, dtype=np.float64), width, height)
+    img = np.ones((width * height, 3))                  # 白色背景
+
+    # -------- 1. 边密度 ------------------------------------------------------
+    keep = labels[u] == labels[v] if aggregate_inter else np.ones(len(u), dtype=bool)
+    density = np.zeros(width * height)
+    _line_pixels(x[u[keep]], y[u[keep]], x[v[keep]], y[v[keep]], w[keep], width, height, density)
+    if density.max() > 0:
+        _blend(img, EDGE_ALPHA * np.log1p(density) / np.log1p(density.max()), EDGE_COLOR)
+
+    # -------- 2. 聚合的社区间边：质心连线 ------------------------------------
+    if aggregate_inter and (~keep).any():
+        _, lab = np.unique(labels, return_inverse=True)
+        sizes = np.bincount(lab)
+        cx, cy = np.bincount(lab, weights=x) / sizes, np.bincount(lab, weights=y) / sizes
+        a, b = np.minimum(lab[u[~keep]], lab[v[~keep]]), np.maximum(lab[u[~keep]], lab[v[~keep]])
+        pairs, inv = np.unique(a * len(sizes) + b, return_inverse=True)
+        pair_w = np.bincount(inv, weights=w[~keep])
+        pa, pb = pairs // len(sizes), pairs % len(sizes)
+        # 2 像素宽的线：四个偏移取并集（取最大值是幂等的，偏移重叠处不会叠加）；
+        # 不同社区对交叉处取最大值，像素深浅只反映经过它的最重的一对的边权和
+        agg = np.zeros(width * height)
+        level = pair_w / pair_w.max()
+        for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            for line, flat in _iter_line_samples(cx[pa] + dx, cy[pa] + dy, cx[pb] + dx, cy[pb] + dy, width, height):
+                np.maximum.at(agg, flat, level[line])
+        _blend(img, AGG_ALPHA * agg, AGG_COLOR)
+
+    # -------- 3. 节点：以圆盘盖章，重叠处取平均色 -----------------------------
+    r = int(node_radius)
+    dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+    disk = dx ** 2 + dy ** 2 <= r * r
+    dx, dy = dx[disk], dy[disk]
+    node = np.repeat(np.arange(len(x)), len(dx))
+    px = (np.rint(x).astype(np.int64)[:, None] + dx).ravel()
+    py = (np.rint(y).astype(np.int64)[:, None] + dy).ravel()
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    flat, node = py[inside] * width + px[inside], node[inside]
+    rgb = community_palette(labels)
+    count = np.bincount(flat, minlength=width * height)
+    hit = count > 0
+    mean = np.column_stack([np.bincount(flat, weights=rgb[node, c], minlength=width * height)[hit]
+                            for c in range(3)]) / count[hit, None]
+    alpha = 1 - (1 - NODE_ALPHA) ** count[hit]
+    img[hit] = img[hit] * (1 - alpha[:, None]) + mean * alpha[:, None]
+
+    matplotlib.image.imsave(path, img.reshape(height, width, 3).clip(0, 1))
+    return path
@@ -7,32 +7,117 @@ import collections            # 提供 defaultdict 与计数器等高效容器
 import random                 # 用于打乱节点访问次序，避免算法陷入局部最优
 import time                   # 计时，衡量算法运行效率
 
+import numpy as np            # CSR 数组后端：邻接表与社区归属均用连续数组存储
+
+from graph_loader import load_edge_arrays, iter_weighted_edges, to_adjacency  # 共用的边列表读取（带二进制缓存）
+from louvain_parallel import best_community, parallel_first_stage  # ΔQ 核心与多进程 Phase‑I
+from louvain_trace import JsonLinesTrace, Stopwatch, emit_pass, emit_sweep  # 观察者与 JSON-lines 追踪
+
 # --------------------------- 全局参数 ----------------------------------------
 MAX_PHASE_I = 10              # Phase‑I（模块度局部优化）允许的最大迭代轮数
 MAX_PASSS   = 10              # 整体算法最多进行多少个 pass（Phase‑I + Phase‑II）
+GRAPH_BACKEND = "dict"        # 图后端："dict"（邻接字典 + Vertex）或 "csr"（NumPy CSR 数组）
+WORKERS     = 1               # csr 后端 Phase‑I 的进程数；>1 时按图着色并行移动顶点
+SEED        = None            # 随机种子；固定后结果可复现（并行模式下与进程数无关）
+FAST_LOCAL_MOVING = False     # True：Phase‑I 用工作队列只复查邻域变化的顶点，代替全扫描
+DELTA_Q_TOL = 0.0             # ΔQ（模块度单位）超过该阈值才迁移顶点
+DENDROGRAM_FILE = "backup/result-impl-dendrogram.npz"  # 每个 pass 的层级映射，可用 partition_at_level 取任意一层
+TRACE_FILE  = None            # 非空时把每轮扫描 / 每个 pass 的统计以 JSON-lines 追加到该文件
+RESOLUTION  = 1.0             # 分辨率 γ，同 community_louvain：值越大社区越小（1.0 即原始 ΔQ 公式）
+WARM_START_FILE = None        # 热启动（仅 dict 后端，csr 后端下设置会报错）：上次的划分结果，如 "backup/result-impl.txt"
+DELTA_FILE  = None            # 热启动时新增的边列表文件（格式同 snn_df.txt）
 
 # --------------------------- 读图函数 ----------------------------------------
 def load_graph(path):                                   # path: 边列表文件
-    G = collections.defaultdict(dict)                   # 邻接表：{u:{v:w}}
-    with open(path) as text:                            # 逐行读取文本
-        for line in text:                               # 每行形如 “u v [w]”
-            vertices = line.strip().split()             # 去掉换行符并按空格切分
-            v_i = int(vertices[0])                      # 顶点 u
-            v_j = int(vertices[1])                      # 顶点 v
-            w   = 1.0                                   # 若无权重，默认权值为 1
-            if len(vertices) > 2:                       # 若第三列存在，则说明有权重
-                w = float(vertices[2])                  # 读取权重
-            G[v_i][v_j] = w                             # 无向图：u→v
-            G[v_j][v_i] = w                             #           v→u
+    src, dst, w = load_edge_arrays(path)                # 批量解析（带 .npz 缓存），每行 “u v [w]”
+    G = to_adjacency(src, dst, w)                       # 邻接表：{u:{v:w}}，无向
     print(">> total edges:", len(G))                    # 打印节点数（近似）
     return G                                            # 返回邻接表
 
+def load_partition(path):                               # 读取 “顶点 id\t社区 id” 格式的划分结果
+    partition = {}
+    with open(path) as text:
+        for line in text:
+            if line.strip():
+                vid, cid = line.split()
+                partition[int(vid)] = int(cid)
+    return partition
+
+# --------------------------- 层级树（dendrogram） ----------------------------
+# 第 l 层数组 levels[l][i] = 第 l 层顶点 i 所属的第 l+1 层超级节点编号；第 0 层顶点
+# 即 node_ids 中的原子顶点。任意一层的划分只需依次做 len(levels) 次数组下标，O(n)。
+def _index_dtype(n):                                    # 能容纳 0..n-1 的最小整型
+    return np.int32 if n < 2**31 else np.int64
+
+def partition_at_level(levels, level, num_nodes=None):  # 原子顶点 → 第 level 层社区编号
+    if level < 0:                                       # 没有任何 pass：每个顶点自成一个社区
+        return np.arange(num_nodes if num_nodes is not None else len(levels[0]))
+    labels = levels[0]
+    for mapping in levels[1:level + 1]:
+        labels = mapping[labels]
+    return labels
+
+def group_by_label(node_ids, labels):                   # 按社区编号分组，返回 [[v1, v2, ...], ...]
+    order  = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    return [np.asarray(node_ids)[g].tolist() for g in np.split(order, bounds) if len(g)]
+
+def save_dendrogram(path, node_ids, levels):            # 二进制保存：node_ids + level_0, level_1, ...
+    np.savez(path, node_ids=np.asarray(node_ids), **{f"level_{i}": lv for i, lv in enumerate(levels)})
+
+def load_dendrogram(path):                              # 返回 (node_ids, levels)
+    with np.load(path) as npz:
+        levels = [npz[f"level_{i}"] for i in range(len(npz.files) - 1)]
+        return npz["node_ids"], levels
+
+# --------------------------- CSR 图（数组后端） -------------------------------
+class CSRGraph:
+    __slots__ = ("node_ids", "indptr", "indices", "weights")
+
+    def __init__(self, node_ids, indptr, indices, weights):
+        self.node_ids = node_ids    # node_ids: 连续编号 i → 原始顶点 id
+        self.indptr   = indptr      # indptr  : 顶点 i 的邻居位于 indices[indptr[i]:indptr[i+1]]
+        self.indices  = indices     # indices : 邻居的连续编号
+        self.weights  = weights     # weights : 与 indices 一一对应的边权
+
+    @property
+    def num_nodes(self):
+        return len(self.indptr) - 1
+
+def build_csr(src, dst, w):                             # src/dst/w: 等长的边数组（原始 id）
+    node_ids, inv = np.unique(np.concatenate([src, dst]), return_inverse=True)
+    n = len(node_ids)                                   # 重新编号为 0..n-1
+    idx_t = np.int32 if n < 2**31 else np.int64
+    u, v = inv[:len(src)], inv[len(src):]
+    rows = np.concatenate([u, v]).astype(np.int64)      # 无向图：u→v 与 v→u
+    cols = np.concatenate([v, u]).astype(np.int64)
+    vals = np.concatenate([w, w]).astype(np.float64)
+    line = np.concatenate([np.arange(len(src))] * 2)    # 行号：重复边以最后一次出现为准（同 load_graph）
+    key  = rows * n + cols
+    order = np.lexsort((line, key))                     # 先按 (u, v) 排序，再按行号
+    key, order = key[order], order
+    last = np.ones(len(key), dtype=bool)
+    last[:-1] = key[1:] != key[:-1]                     # 每组 (u, v) 只保留最后一条
+    keep = order[last]
+    rows, cols, vals = rows[keep], cols[keep], vals[keep]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return CSRGraph(node_ids, indptr, cols.astype(idx_t), vals)
+
+def load_graph_csr(path):                               # 读取边列表为 CSRGraph
+    src, dst, w = load_edge_arrays(path)                # 数组直接进入 CSR，不经过 Python 对象
+    G = build_csr(src, dst, w)
+    print(">> total edges:", G.num_nodes)               # 与 load_graph 一致，打印节点数
+    return G
+
 # --------------------------- 节点对象 ----------------------------------------
 class Vertex:
+    __slots__ = ("_vid", "_cid", "_nodes", "_kin")  # 不为每个对象分配 __dict__，节省内存
+
     def __init__(self, vid, cid, nodes, k_in=0):
         self._vid   = vid       # vid  : 顶点自身编号
         self._cid   = cid       # cid  : 顶点当前归属的社区编号
-        self._nodes = nodes     # nodes: 若合并为超级节点则存原子节点集合
+        self._nodes = nodes     # nodes: 恒为 None；原子成员关系由 Louvain._levels 记录
         self._kin   = k_in      # kin  : “内部”边权和（节点自身所在社区内部）
 
     def __str__(self):          # 便于打印调试
@@ -42,176 +127,584 @@ class Vertex:
 
 # --------------------------- Louvain 主类 ------------------------------------
 class Louvain:
-    def __init__(self, G):
+    def __init__(self, G, max_phase_i=MAX_PHASE_I, max_pass=MAX_PASSS, delta_q_tol=0.0,
+                 min_move_ratio=0.0, fast_local_moving=False, partition=None, delta_edges=None,
+                 resolution=1.0, observers=None):
+        # partition  : 热启动用的上次划分 {vid: cid}（如 backup/result-impl.txt）
+        # delta_edges: 新增边 [(u, v, w), ...]，合并进 G；热启动时第一个 pass 只复查其端点及邻居
+        # observers  : 观察者列表，每轮扫描 / 每个 pass 结束时以事件 dict 调用（见 louvain_trace）
+        self._max_phase_i       = max_phase_i        # Phase‑I 最多全扫描轮数（队列模式下折算为评估次数上限）
+        self._max_pass          = max_pass           # 最多 pass 数
+        self._delta_q_tol       = delta_q_tol        # ΔQ（模块度单位，即单次迁移带来的 Q 增量）超过该阈值才迁移
+        self._min_move_ratio    = min_move_ratio     # 一轮迁移数 ≤ 该比例×顶点数时提前结束 Phase‑I
+        self._fast_local_moving = fast_local_moving  # True：用工作队列代替全扫描
+        self._resolution        = resolution         # 分辨率 γ：ΔQ 中零模型项 k_v·Σtot 的系数，与 best_partition 的 resolution 同义
+        self._observers         = list(observers or ())
+        self._pass              = 0                  # 当前 pass 编号
+        self._evaluations       = 0                  # 累计 ΔQ 计算次数
+        self._cluster_num       = 0                  # 当前非空社区数，迁移时增量维护
         self._G            = G                       # 当前工作图（动态凝聚）
         self._m            = 0                       # 图中边权总和 (∑_e w_e)
         self._cid_vertices = {}                      # {cid : set(vid)} 社区→节点
         self._vid_vertex   = {}                      # {vid : Vertex对象}
+        self._k            = {}                      # {vid : 节点度(含内部边)}
+        self._tot          = {}                      # {cid : 社区总度 Σtot}
+        self._touched      = None                    # 热启动：第一个 pass 需复查的顶点集合
+
+        delta_vids = set()                           # 新增边的端点
+        for v_i, v_j, w in delta_edges or ():        # 合并新增边（已存在则覆盖权重）
+            self._G[v_i][v_j] = w
+            self._G[v_j][v_i] = w
+            delta_vids.update((v_i, v_j))
 
         for vid in self._G.keys():                   # 初始化：每个点单独成社区
             self._cid_vertices[vid] = {vid}          # 社区 cid=vid，成员仅自己
-            self._vid_vertex[vid]   = Vertex(vid, vid, {vid})  # 创建 Vertex
+            self._vid_vertex[vid]   = Vertex(vid, vid, None)   # 创建 Vertex；原子成员关系由 self._levels 记录
             self._m += sum([w for nbr, w in self._G[vid].items() if nbr > vid])
                                                       # 只统计一次无向边权
+        if partition is not None:                    # 热启动：沿用上次划分
+            self._warm_start(partition, delta_vids)
+        self._init_degrees()                         # 预先算好节点度与社区总度
+
+        self._node_ids   = list(self._vid_vertex)    # 第 0 层（原子）顶点次序
+        self._level_vids = self._node_ids            # 当前层顶点次序，下标即该层顶点编号
+        self._levels     = []                        # 层级树：每个 pass 一个数组，本层顶点 → 上一层超级节点
 
         print("====> m:", self._m)                   # 打印总边权
 
+    # ----------------------- 热启动 ------------------------------------------
+    def _warm_start(self, partition, delta_vids):
+        rep = {}                                     # {上次社区 id : 代表顶点}，新 cid 取代表顶点 vid
+        reused = 0
+        for vid in self._G.keys():
+            label = partition.get(vid)
+            if label is None:                        # 新顶点：保持单点社区，并需要复查
+                delta_vids.add(vid)
+                continue
+            reused += 1
+            cid = rep.setdefault(label, vid)
+            if cid != vid:                           # 并入代表顶点所在社区
+                self._vid_vertex[vid]._cid = cid
+                self._cid_vertices[cid].add(vid)
+                self._cid_vertices[vid].remove(vid)
+
+        # 只复查新增边的端点与它们的邻居，其余顶点直接沿用上次结果
+        self._touched = set(delta_vids)
+        for vid in delta_vids:
+            self._touched.update(self._G[vid])
+        print(f"====> warm start: reused {reused}/{len(self._G)} vertices, "
+              f"communities:{len(rep)}, re-optimize:{len(self._touched)}")
+
+    # ----------------------- 度数簿记 ----------------------------------------
+    def _init_degrees(self):                         # 一次性计算每个顶点的度与社区 Σtot，O(E)
+        self._k   = {}
+        self._tot = collections.defaultdict(float)
+        for vid, nbrs in self._G.items():
+            k_v = sum(nbrs.values()) + 2 * self._vid_vertex[vid]._kin  # 内部边两端都计入度
+            self._k[vid] = k_v
+            self._tot[self._vid_vertex[vid]._cid] += k_v
+        self._cluster_num = sum(1 for vertices in self._cid_vertices.values() if vertices)
+
+    def community_count(self):                       # 当前非空社区数，O(1)
+        return self._cluster_num
+
+    # ----------------------- 单个顶点的最佳去向 -------------------------------
+    def _best_move(self, v_vid):                     # 返回 (目标社区, 最大 ΔQ)
+        v_cid = self._vid_vertex[v_vid]._cid          # 顶点所在的社区
+        k_v   = self._k[v_vid]                       # 节点度（含内部边），已预先计算
+
+        # 一次遍历邻接表，得到 v 到各邻居社区的边权和 {cid: k_v_in}
+        cid_kin = {}
+        for w_vid, w in self._G[v_vid].items():
+            w_cid = self._vid_vertex[w_vid]._cid
+            cid_kin[w_cid] = cid_kin.get(w_cid, 0.0) + w
+
+        # ΔQ 以模块度为单位：移入 w_cid 的增益减去留在原社区的增益，
+        #   ΔQ = (k_v_in − k_v_in2) / m − γ·k_v·(tot − (tot2 − k_v)) / (2m²)
+        # 只有 ΔQ > 0 的迁移才会提高模块度
+        m2 = 2 * self._m
+        # deltaQ(D->i)：把 v 移出原社区，对所有候选社区都相同
+        k_v_in2  = cid_kin.get(v_cid, 0.0)           # v→原社区内部边权
+        tot2     = self._tot[v_cid]                  # 原社区总度（含 v）
+        delta_Q2 = (-k_v_in2 + self._resolution * k_v * (tot2 - k_v) / m2) / self._m
+
+        cid_Q = {}                                   # {候选社区: ΔQ}，存储模块度增益大于0的社区编号
+
+        for w_cid, k_v_in in cid_kin.items():        # 遍历邻居社区
+            if w_cid == v_cid:                       # 同社区跳过
+                continue
+
+            # ---------- 计算 ΔQ: 将 v_vid 移入 w_cid 带来的模块度增益 ----
+            tot = self._tot[w_cid]                   # 社区总度
+            delta_Q1 = (k_v_in - self._resolution * k_v * tot / m2) / self._m
+            # above is deltaQ(i->C)
+
+            # add the 2 deltas.
+            delta_Q = delta_Q1  + delta_Q2
+
+            cid_Q[w_cid] = delta_Q                   # 记录 ΔQ 值
+
+        self._evaluations += len(cid_Q)
+
+        # 若无可移动的社区，则设定哨兵值
+        if not cid_Q:
+            return 0, -1
+        return max(cid_Q.items(), key=lambda x: x[1])
+
+    def _move(self, v_vid, cid):                     # 把 v_vid 迁入社区 cid，O(1) 更新 Σtot
+        v_cid = self._vid_vertex[v_vid]._cid
+        k_v   = self._k[v_vid]
+        self._vid_vertex[v_vid]._cid = cid           # 更新节点社区
+        self._cid_vertices[cid].add(v_vid)           # 加入新社区
+        self._cid_vertices[v_cid].remove(v_vid)      # 移出旧社区
+        self._tot[cid]   += k_v                      # O(1) 更新两社区总度
+        self._tot[v_cid] -= k_v
+        if not self._cid_vertices[v_cid]:            # 目标社区必非空，只有原社区可能变空
+            self._cluster_num -= 1
+
     # ----------------------- Phase‑I : 模块度局部优化 ------------------------
     def first_stage(self):
         mod_inc = False                              # 标记本 pass 内是否有模块度提升
         visit_sequence = list(self._G.keys())        # 所有顶点组成访问序列
         random.shuffle(visit_sequence)               # 打乱访问顺序
+        if self._touched is not None:                # 热启动的第一个 pass：从受影响顶点出发的队列模式
+            visit_sequence = [v for v in visit_sequence if v in self._touched]
+            self._touched  = None
+            return self._first_stage_queue(visit_sequence)
+        if self._fast_local_moving:                  # 队列模式：只复查邻域发生变化的顶点
+            return self._first_stage_queue(visit_sequence)
 
         iter_times_phaseI = 0                        # Phase‑I 的迭代计数
         while True:                                  # 循环直到无法再提升模块度
             log_max_deltaQ = 0                       # 记录本轮最大 ΔQ
             iter_times_phaseI += 1                   # +1 轮
 
-            cluster_num = len([v for v in self._cid_vertices.values() if v])        # 当前 cluster 总数
-            print(f"0=> phaseI iter:{iter_times_phaseI} (max:{MAX_PHASE_I}) | cluster_num:{cluster_num}")
+            cluster_num = self._cluster_num          # 当前 cluster 总数（增量维护）
+            print(f"0=> phaseI iter:{iter_times_phaseI} (max:{self._max_phase_i}) | cluster_num:{cluster_num}")
 
-            can_stop = True                          # 第一阶段是否可终止
+            moves = 0                                # 本轮迁移次数
+            if self._observers:                      # 仅在有观察者时计时
+                watch, evaluations = Stopwatch(), self._evaluations
 
             for v_vid in visit_sequence:             # 遍历所有顶点
                 v_cid = self._vid_vertex[v_vid]._cid  # 顶点所在的社区
-                k_v   = sum(self._G[v_vid].values()) + self._vid_vertex[v_vid]._kin
-                                                      # 节点度（含内部边）
-
-                cid_Q = {}                           # {候选社区: ΔQ}，存储模块度增益大于0的社区编号
-
-                for w_vid in self._G[v_vid].keys():  # 遍历邻居
-                    w_cid = self._vid_vertex[w_vid]._cid  # 邻居社区
-                    if w_cid == v_cid:               # 同社区跳过
-                        continue
-                    if w_cid in cid_Q:               # 该社区已算过 ΔQ
-                        continue
-
-                    # ---------- 计算 ΔQ: 将 v_vid 移入 w_cid 带来的模块度增益 ----
-                    tot = sum([sum(self._G[k].values()) + self._vid_vertex[k]._kin
-                               for k in self._cid_vertices[w_cid]])  # 社区总度
-                    k_v_in = sum([w for k, w in self._G[v_vid].items()
-                                   if k in self._cid_vertices[w_cid]])  # v→社区内部边权
-                    delta_Q1 = k_v_in - k_v * tot / self._m              # 简化的 ΔQ
-                    # above is deltaQ(i->C)
-
-                    # below is deltaQ(D->i)
-                    k_v_in2 = sum([v for k, v in self._G[v_vid].items() if k in self._cid_vertices[v_cid]])
-                    tot2 = sum(
-                        [ sum(self._G[k].values()) + self._vid_vertex[k]._kin  for k in self._cid_vertices[v_cid]] )
-                    delta_Q2 = (-k_v_in2 + k_v * (tot2 - k_v)) / (2 * self._m)
-
-                    # add the 2 deltas.
-                    delta_Q = delta_Q1  + delta_Q2
-
-                    cid_Q[w_cid] = delta_Q              # 记录 ΔQ 值
-
-                # 若无可移动的社区，则设定哨兵值
-                if not cid_Q:
-                    cid, max_delta_Q = 0, -1
-                else:
-                    cid, max_delta_Q = max(cid_Q.items(), key=lambda x: x[1])
+                cid, max_delta_Q = self._best_move(v_vid)
 
                 log_max_deltaQ = max(log_max_deltaQ, max_delta_Q)  # 更新最大 ΔQ
 
-                # ----------- 若 ΔQ>0 且目标社区不同，则执行迁移 -----------------
-                if max_delta_Q > 0.0 and cid != v_cid:
-                    self._vid_vertex[v_vid]._cid = cid              # 更新节点社区
-                    self._cid_vertices[cid].add(v_vid)              # 加入新社区
-                    self._cid_vertices[v_cid].remove(v_vid)         # 移出旧社区
-                    can_stop = False                                # 标记需继续循环
-                    mod_inc  = True                                 # 整体模块度提升
-                
-            if iter_times_phaseI >= MAX_PHASE_I:    # 超过最大轮次则强制停止
+                # ----------- 若 ΔQ 超过阈值且目标社区不同，则执行迁移 -----------
+                if max_delta_Q > self._delta_q_tol and cid != v_cid:
+                    self._move(v_vid, cid)
+                    moves  += 1                                     # 标记需继续循环
+                    mod_inc = True                                  # 整体模块度提升
+
+            if self._observers:
+                emit_sweep(self, iter_times_phaseI, len(visit_sequence), moves,
+                           self._evaluations - evaluations, watch)
+
+            can_stop = moves <= self._min_move_ratio * len(visit_sequence)  # 几乎没有节点移动则可终止
+            if iter_times_phaseI >= self._max_phase_i:  # 超过最大轮次则强制停止
                 can_stop = True
-            if can_stop:                            # 若整轮没有节点移动则退出
+            if can_stop:                            # 若整轮没有（足够多）节点移动则退出
                 break
 
             print(f"\tmax_delta_Q:{log_max_deltaQ}")  # 打印本轮最大 ΔQ
 
         return mod_inc                              # 返回是否有模块度提升
 
+    def _first_stage_queue(self, visit_sequence):
+        # fast local moving：队列初始为全部顶点；某顶点迁移后，只把不在新社区、
+        # 且不在队列中的邻居重新入队；队列清空即收敛
+        mod_inc = False
+        queue    = collections.deque(visit_sequence)
+        in_queue = set(visit_sequence)
+        budget   = self._max_phase_i * len(visit_sequence)  # 评估次数上限，与最多 max_phase_i 轮全扫描相当
+        evaluations = moves = 0
+        if self._observers:
+            watch, dq_evaluations = Stopwatch(), self._evaluations
+        while queue and evaluations < budget:
+            v_vid = queue.popleft()
+            in_queue.discard(v_vid)
+            evaluations += 1
+            cid, max_delta_Q = self._best_move(v_vid)
+            if max_delta_Q > self._delta_q_tol and cid != self._vid_vertex[v_vid]._cid:
+                self._move(v_vid, cid)
+                moves  += 1
+                mod_inc = True
+                for w_vid in self._G[v_vid]:         # 邻域发生变化的顶点重新入队
+                    if w_vid not in in_queue and self._vid_vertex[w_vid]._cid != cid:
+                        queue.append(w_vid)
+                        in_queue.add(w_vid)
+        print(f"0=> phaseI queue | evaluations:{evaluations} moves:{moves} (budget:{budget})")
+        if queue:                                    # 评估次数用尽而非队列清空：本 pass 未完全收敛
+            print(f"\tphaseI queue stopped by budget, {len(queue)} vertices still queued")
+        if self._observers:
+            emit_sweep(self, 1, evaluations, moves, self._evaluations - dq_evaluations, watch)
+        return mod_inc
+
     # ----------------------- Phase‑II : 网络凝聚 ------------------------------
     def second_stage(self):
         print("== Phase II begin ==")
         cid_vertices = {}                           # 新社区→节点
         vid_vertex   = {}                           # 新节点编号→Vertex
 
-        # —— 把每个社区收缩为一个“超级节点” ——
+        # —— 单次扫描边表：收缩超级节点，同时累加社区间边权 ——
+        rank        = {}                           # {cid : 在社区表中的次序}，用于复现原有建图顺序
+        pair_weight = collections.defaultdict(float)  # {(cid1, cid2) : 边权}，cid1 < cid2
         for cid, vertices in self._cid_vertices.items():
             if not vertices:                        # 空社区跳过
                 continue
-            new_vertex = Vertex(cid, cid, set())    # 新节点 id=cid
-            for vid in vertices:                   # 合并社区中所有原子节点
-                new_vertex._nodes.update(self._vid_vertex[vid]._nodes)
+            rank[cid] = len(rank)
+            new_vertex = Vertex(cid, cid, None)     # 新节点 id=cid；成员关系记录在 self._levels 中
+            for vid in vertices:                   # 合并社区中所有顶点
                 new_vertex._kin += self._vid_vertex[vid]._kin
-                for k, w in self._G[vid].items():  # 计算内部权重
-                    if k in vertices:
+                for k, w in self._G[vid].items():  # 每条边只看一次
+                    k_cid = self._vid_vertex[k]._cid
+                    if k_cid == cid:               # 内部边计入 kin
                         new_vertex._kin += w / 2.0 # 每条内部边仅算一次
+                    elif cid < k_cid:              # 社区间边只从编号小的一侧累加
+                        pair_weight[(cid, k_cid)] += w
             cid_vertices[cid] = {cid}              # 新社区的成员仅自己
             vid_vertex[cid]   = new_vertex         # 存储新节点对象
 
-        # —— 重新构建社区间的边 ——  
+        # —— 按原上三角遍历顺序写入新图，保证结果与逐对扫描一致 ——
         G = collections.defaultdict(dict)          # 新图
-        for cid1, vertices1 in self._cid_vertices.items():
-            if not vertices1:
-                continue
-            for cid2, vertices2 in self._cid_vertices.items():
-                if cid2 <= cid1 or not vertices2:  # 只处理上三角避免重复
-                    continue
-                edge_weight = 0.0
-                for vid in vertices1:              # 累加两个社区之间的边权
-                    for k, w in self._G[vid].items():
-                        if k in vertices2:
-                            edge_weight += w
-                if edge_weight:                    # 若权重非零则添加到新图
-                    G[cid1][cid2] = edge_weight
-                    G[cid2][cid1] = edge_weight
+        for (cid1, cid2), edge_weight in sorted(pair_weight.items(),
+                                                 key=lambda x: (rank[x[0][0]], rank[x[0][1]])):
+            if edge_weight:                        # 若权重非零则添加到新图
+                G[cid1][cid2] = edge_weight
+                G[cid2][cid1] = edge_weight
+
+        # —— 记录本层顶点 → 超级节点（按 rank 编号），供层级树查询 ——
+        self._levels.append(np.array([rank[self._vid_vertex[vid]._cid] for vid in self._level_vids],
+                                     dtype=_index_dtype(len(rank))))
+        self._level_vids = list(rank)
 
         # —— 用新图替换旧图，准备下一 pass ——
         self._cid_vertices = cid_vertices
         self._vid_vertex   = vid_vertex
         self._G            = G
+        self._init_degrees()                       # 新图上重新计算度与 Σtot
         print("=====> cluster:", len(self._G))     # 打印当前社区数
 
+    # ----------------------- 模块度 ------------------------------------------
+    def modularity(self):                          # 当前划分在原图上的模块度 Q
+        L = collections.defaultdict(float)         # {cid : 社区内部边权}
+        D = collections.defaultdict(float)         # {cid : 社区总度}
+        for vid, vertex in self._vid_vertex.items():
+            L[vertex._cid] += vertex._kin
+            D[vertex._cid] += 2 * vertex._kin
+            for k, w in self._G[vid].items() if vid in self._G else ():
+                D[vertex._cid] += w
+                if self._vid_vertex[k]._cid == vertex._cid:
+                    L[vertex._cid] += w / 2.0      # 内部边两端各计一半
+        return sum(L[c] / self._m - (D[c] / (2 * self._m)) ** 2 for c in D)
+
+    # ----------------------- 层级树 ------------------------------------------
+    def get_dendrogram(self):                      # 返回 (原子顶点 id 数组, 每层映射数组列表)
+        levels = list(self._levels)
+        cids = [self._vid_vertex[vid]._cid for vid in self._level_vids]
+        if any(cid != vid for cid, vid in zip(cids, self._level_vids)):  # 当前层还有未凝聚的迁移
+            rank = {}
+            levels.append(np.array([rank.setdefault(cid, len(rank)) for cid in cids],
+                                   dtype=_index_dtype(len(cids))))
+        return np.array(self._node_ids), levels
+
     # ----------------------- 获取最终社区列表 ---------------------------------
     def get_communities(self):
-        communities = []                           # 最终结果: [ [v1,v2,...], ... ]
-        for vertices in self._cid_vertices.values():
-            if vertices:
-                c = set()
-                for vid in vertices:
-                    c.update(self._vid_vertex[vid]._nodes) # 展开超级节点
-                communities.append(list(c))
-        return communities
+        node_ids, levels = self.get_dendrogram()   # 由层级树直接得到最终划分，不展开超级节点集合
+        return group_by_label(node_ids, partition_at_level(levels, len(levels) - 1, len(node_ids)))
 
     # ----------------------- 算法入口 ----------------------------------------
     def execute(self):
         iter_time = 0                              # pass 计数
         while True:
             iter_time += 1
-            if iter_time > MAX_PASSS:              # 防止死循环
+            if iter_time > self._max_pass:         # 防止死循环
                 break
-            print(f"\n>>> Pass iter_time:{iter_time} (max:{MAX_PASSS})")
+            print(f"\n>>> Pass iter_time:{iter_time} (max:{self._max_pass})")
+            self._pass = iter_time
+            watch   = Stopwatch() if self._observers else None
             mod_inc = self.first_stage()           # Phase‑I
+            phase1  = watch.elapsed() if watch else None
 
             if mod_inc:                            # 若模块度得到提升
+                watch = Stopwatch() if self._observers else None
                 self.second_stage()                #   继续 Phase‑II
+                if watch:
+                    emit_pass(self, phase1, watch.elapsed())
             else:                                  # 否则停止迭代
+                if watch:
+                    emit_pass(self, phase1, None)
                 print("-------Stop Phase II-----")
                 break
+        print("====> modularity:", round(self.modularity(), 6))  # 打印最终模块度
         return self.get_communities()              # 返回社区划分结果
 
+def csr_modularity(indptr, indices, weights, labels, kin=None):  # CSR 图上划分 labels 的模块度 Q
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    kin  = np.zeros(n) if kin is None else kin
+    m    = float(weights[indices > rows].sum()) + kin.sum()          # 总边权（含已凝聚的内部边）
+    C    = int(labels.max()) + 1 if n else 0
+    internal = labels[rows] == labels[indices]
+    L = np.bincount(labels, weights=kin, minlength=C)                # 社区内部边权
+    L += np.bincount(labels[rows[internal]], weights=weights[internal], minlength=C) / 2.0
+    deg = np.bincount(rows, weights=weights, minlength=n) + 2 * kin
+    D = np.bincount(labels, weights=deg, minlength=C)                # 社区总度
+    return float((L / m - (D / (2 * m)) ** 2).sum())
+
+# --------------------------- Louvain（CSR 数组后端） ----------------------------
+# 与 Louvain 使用相同的 ΔQ 公式与迭代流程，但图、度、社区归属全部为 NumPy 数组：
+# 每个顶点只占几个数组元素，而不是 Vertex 对象 + set。
+class LouvainCSR:
+    def __init__(self, G, workers=1, seed=None, max_phase_i=MAX_PHASE_I, max_pass=MAX_PASSS,
+                 delta_q_tol=0.0, min_move_ratio=0.0, fast_local_moving=False, resolution=1.0,
+                 observers=None):
+        self._workers   = workers                    # Phase‑I 进程数，1 为串行
+        self._max_phase_i       = max_phase_i        # 各参数含义同 Louvain
+        self._max_pass          = max_pass
+        self._delta_q_tol       = delta_q_tol
+        self._min_move_ratio    = min_move_ratio
+        self._fast_local_moving = fast_local_moving  # 仅串行模式生效
+        self._resolution        = resolution
+        self._observers         = list(observers or ())
+        self._pass              = 0
+        self._evaluations       = 0
+        self._rng       = random if seed is None else random.Random(seed)  # 访问顺序的随机源
+        self._node_ids  = G.node_ids                 # 原始顶点 id，用于输出
+        self._indptr    = G.indptr                   # 当前工作图（凝聚后替换）
+        self._indices   = G.indices
+        self._weights   = G.weights
+        n = G.num_nodes
+        self._kin       = np.zeros(n)                # 每个（超级）顶点的内部边权
+        self._comm      = np.arange(n)               # 当前图中 顶点 → 社区
+        self._node_comm = np.arange(n)               # 原子顶点 → 当前图中的顶点
+        self._levels    = []                         # 层级树：每个 pass 一个数组，本层顶点 → 上一层超级节点
+        rows = np.repeat(np.arange(n), np.diff(self._indptr))
+        self._m = float(self._weights[self._indices > rows].sum())  # 只统计一次无向边权
+        self._init_degrees()
+
+        print("====> m:", self._m)                   # 打印总边权
+
+    def _init_degrees(self):                         # 向量化计算顶点度与社区总度
+        n = len(self._indptr) - 1
+        rows = np.repeat(np.arange(n), np.diff(self._indptr))
+        self._k   = np.bincount(rows, weights=self._weights, minlength=n) + 2 * self._kin
+        self._tot = np.bincount(self._comm, weights=self._k, minlength=n)
+
+    def community_count(self):                       # 当前非空社区数
+        return int(np.count_nonzero(np.bincount(self._comm)))
+
+    # ----------------------- 模块度 ------------------------------------------
+    def modularity(self):                            # 当前划分在原图上的模块度 Q
+        return csr_modularity(self._indptr, self._indices, self._weights, self._comm, self._kin)
+
+    # ----------------------- Phase‑I : 模块度局部优化 ------------------------
+    def first_stage(self):
+        if self._workers > 1:                        # 并行模式：着色 + 进程池
+            return parallel_first_stage(self, self._workers, self._max_phase_i, self._rng,
+                                        self._delta_q_tol, self._min_move_ratio)
+        mod_inc = False
+        visit_sequence = list(range(len(self._indptr) - 1))
+        self._rng.shuffle(visit_sequence)            # 打乱访问顺序
+        if self._fast_local_moving:                  # 队列模式：只复查邻域发生变化的顶点
+            return self._first_stage_queue(visit_sequence)
+        indptr, indices, weights, comm, k, tot, m, scratch = self._serial_state()
+
+        iter_times_phaseI = 0
+        while True:
+            log_max_deltaQ = 0
+            iter_times_phaseI += 1
+
+            cluster_num = self.community_count()
+            print(f"0=> phaseI iter:{iter_times_phaseI} (max:{self._max_phase_i}) | cluster_num:{cluster_num}")
+
+            moves = 0
+            if self._observers:
+                watch, evaluations = Stopwatch(), self._evaluations
+
+            for v_vid in visit_sequence:
+                v_cid, k_v = comm[v_vid], k[v_vid]
+                cid, max_delta_Q, _, _, n_cand = best_community(v_vid, indptr, indices, weights, comm, k,
+                                                                tot, m, self._resolution, scratch)
+                self._evaluations += n_cand
+                log_max_deltaQ = max(log_max_deltaQ, max_delta_Q)
+
+                if max_delta_Q > self._delta_q_tol and cid >= 0:      # cid=-1：无候选社区
+                    comm[v_vid] = cid
+                    tot[cid]   += k_v
+                    tot[v_cid] -= k_v
+                    moves  += 1
+                    mod_inc = True
+
+            if self._observers:
+                self._sync(comm, tot)
+                emit_sweep(self, iter_times_phaseI, len(visit_sequence), moves,
+                           self._evaluations - evaluations, watch)
+
+            can_stop = moves <= self._min_move_ratio * len(visit_sequence)
+            if iter_times_phaseI >= self._max_phase_i:
+                can_stop = True
+            if can_stop:
+                break
+
+            print(f"\tmax_delta_Q:{log_max_deltaQ}")
+
+        self._sync(comm, tot)
+        return mod_inc
+
+    def _serial_state(self):
+        # 串行 Phase‑I 逐顶点访问标量：社区、度、Σtot 转为 Python list（O(n)），
+        # 邻接数组仍为 NumPy，由 best_community 按顶点切片；scratch 为预分配的累加区
+        return (self._indptr.tolist(), self._indices, self._weights, self._comm.tolist(),
+                self._k.tolist(), self._tot.tolist(), self._m, [None] * len(self._comm))
+
+    def _sync(self, comm, tot):                      # 把 list 上的迁移结果写回数组
+        self._comm[:] = comm
+        self._tot[:]  = tot
+
+    def _first_stage_queue(self, visit_sequence):    # fast local moving，逻辑同 Louvain._first_stage_queue
+        mod_inc = False
+        indptr, indices, weights, comm, k, tot, m, scratch = self._serial_state()
+        queue    = collections.deque(visit_sequence)
+        in_queue = [False] * len(comm)
+        for v_vid in visit_sequence:
+            in_queue[v_vid] = True
+        budget   = self._max_phase_i * len(visit_sequence)
+        evaluations = moves = 0
+        if self._observers:
+            watch, dq_evaluations = Stopwatch(), self._evaluations
+        while queue and evaluations < budget:
+            v_vid = queue.popleft()
+            in_queue[v_vid] = False
+            evaluations += 1
+            v_cid, k_v = comm[v_vid], k[v_vid]
+            cid, max_delta_Q, _, _, n_cand = best_community(v_vid, indptr, indices, weights, comm, k,
+                                                            tot, m, self._resolution, scratch)
+            self._evaluations += n_cand
+            if max_delta_Q > self._delta_q_tol and cid >= 0:
+                comm[v_vid] = cid
+                tot[cid]   += k_v
+                tot[v_cid] -= k_v
+                moves  += 1
+                mod_inc = True
+                for w_vid in indices[indptr[v_vid]:indptr[v_vid + 1]].tolist():  # 邻域发生变化的顶点重新入队
+                    if not in_queue[w_vid] and comm[w_vid] != cid:
+                        queue.append(w_vid)
+                        in_queue[w_vid] = True
+        print(f"0=> phaseI queue | evaluations:{evaluations} moves:{moves} (budget:{budget})")
+        if queue:                                    # 评估次数用尽而非队列清空：本 pass 未完全收敛
+            print(f"\tphaseI queue stopped by budget, {len(queue)} vertices still queued")
+        self._sync(comm, tot)
+        if self._observers:
+            emit_sweep(self, 1, evaluations, moves, self._evaluations - dq_evaluations, watch)
+        return mod_inc
+
+    # ----------------------- Phase‑II : 网络凝聚 ------------------------------
+    def second_stage(self):
+        print("== Phase II begin ==")
+        n = len(self._indptr) - 1
+        _, new_cid = np.unique(self._comm, return_inverse=True)  # 社区重编号为 0..C-1
+        C = int(new_cid.max()) + 1 if n else 0
+
+        rows = np.repeat(np.arange(n), np.diff(self._indptr))
+        c_row, c_col = new_cid[rows], new_cid[self._indices]
+        internal = c_row == c_col
+
+        # 内部边：并入超级节点的 kin（每条内部边在两个方向各出现一次，各计一半）
+        kin = np.bincount(new_cid, weights=self._kin, minlength=C)
+        kin += np.bincount(c_row[internal], weights=self._weights[internal], minlength=C) / 2.0
+
+        # 社区间边：按 (cid1, cid2) 合并权重，结果已按行排序即为新 CSR
+        key = c_row[~internal].astype(np.int64) * C + c_col[~internal]
+        pairs, inv = np.unique(key, return_inverse=True)
+        weights = np.bincount(inv, weights=self._weights[~internal], minlength=len(pairs))
+        new_rows, new_cols = pairs // C, pairs % C
+
+        self._indptr  = np.zeros(C + 1, dtype=np.int64)
+        np.cumsum(np.bincount(new_rows, minlength=C), out=self._indptr[1:])
+        self._indices = new_cols.astype(self._indices.dtype)
+        self._weights = weights
+        self._kin     = kin
+        self._comm    = np.arange(C)
+        self._node_comm = new_cid[self._node_comm]   # 原子顶点 → 新超级节点
+        self._levels.append(new_cid.astype(_index_dtype(C)))
+        self._init_degrees()
+        print("=====> cluster:", C)
+
+    # ----------------------- 获取最终社区列表 ---------------------------------
+    def get_labels(self):                            # 原子顶点（连续编号）→ 最终社区
+        return self._comm[self._node_comm]
+
+    def get_dendrogram(self):                        # 返回 (原子顶点 id 数组, 每层映射数组列表)
+        levels = list(self._levels)
+        if np.any(self._comm != np.arange(len(self._comm))):  # 当前层还有未凝聚的迁移
+            _, top = np.unique(self._comm, return_inverse=True)
+            levels.append(top.astype(_index_dtype(len(top))))
+        return self._node_ids, levels
+
+    def get_communities(self):
+        return group_by_label(self._node_ids, self.get_labels())
+
+    # ----------------------- 算法入口 ----------------------------------------
+    def execute(self):
+        iter_time = 0
+        while True:
+            iter_time += 1
+            if iter_time > self._max_pass:
+                break
+            print(f"\n>>> Pass iter_time:{iter_time} (max:{self._max_pass})")
+            self._pass = iter_time
+            watch   = Stopwatch() if self._observers else None
+            mod_inc = self.first_stage()
+            phase1  = watch.elapsed() if watch else None
+
+            if mod_inc:
+                watch = Stopwatch() if self._observers else None
+                self.second_stage()
+                if watch:
+                    emit_pass(self, phase1, watch.elapsed())
+            else:
+                if watch:
+                    emit_pass(self, phase1, None)
+                print("-------Stop Phase II-----")
+                break
+        print("====> modularity:", round(self.modularity(), 6))
+        return self.get_communities()
+
 # --------------------------- 主程序 ------------------------------------------
 if __name__ == '__main__':
     # -------- 1. 读取数据集 ---------------------------------------------------
+    if GRAPH_BACKEND == "csr" and WARM_START_FILE:  # csr 后端不支持热启动，避免把冷启动结果当作热启动输出
+        raise ValueError("WARM_START_FILE 仅适用于 dict 后端，请设置 GRAPH_BACKEND = \"dict\" 或清空 WARM_START_FILE")
     input_file = 'data/snn_df.txt'                # 边列表文件路径
-    G = load_graph(input_file)                    # 载入无向加权图
+    if GRAPH_BACKEND == "csr":                    # 数组后端：适合千万级边的大图
+        G = load_graph_csr(input_file)
+    else:                                         # 默认：邻接字典
+        G = load_graph(input_file)                # 载入无向加权图
 
     # -------- 2. 运行 Louvain 算法 ------------------------------------------
+    trace       = JsonLinesTrace(TRACE_FILE) if TRACE_FILE else None  # 运行追踪（可选）
+    observers   = [trace] if trace else None
     start_time  = time.time()                     # 计时开始
-    algorithm   = Louvain(G)                      # 创建算法实例
+    if GRAPH_BACKEND == "csr":                    # 创建算法实例
+        algorithm = LouvainCSR(G, workers=WORKERS, seed=SEED, delta_q_tol=DELTA_Q_TOL,
+                               fast_local_moving=FAST_LOCAL_MOVING, resolution=RESOLUTION,
+                               observers=observers)
+    elif WARM_START_FILE:                         # 热启动：沿用上次划分，只复查新增边附近
+        delta_edges = iter_weighted_edges(*load_edge_arrays(DELTA_FILE)) if DELTA_FILE else None
+        algorithm = Louvain(G, delta_q_tol=DELTA_Q_TOL, fast_local_moving=FAST_LOCAL_MOVING,
+                            partition=load_partition(WARM_START_FILE), delta_edges=delta_edges,
+                            resolution=RESOLUTION, observers=observers)
+    else:
+        algorithm = Louvain(G, delta_q_tol=DELTA_Q_TOL, fast_local_moving=FAST_LOCAL_MOVING,
+                            resolution=RESOLUTION, observers=observers)
     communities = algorithm.execute()             # 执行并获得社区
     end_time    = time.time()                     # 计时结束
+    if trace:
+        trace.close()
+        print("trace_file:", TRACE_FILE)
 
     # -------- 3. 输出结果 ----------------------------------------------------
     communities = sorted(communities, key=lambda x: -len(x))  # 按社区规模排序
@@ -226,6 +719,8 @@ if __name__ == '__main__':
             for v in comm:
                 fw.write(f"{v}\t{cid}\n")         # “顶点 id  社区 id”
     print("output_file:", output_file)
+    save_dendrogram(DENDROGRAM_FILE, *algorithm.get_dendrogram())  # 保存全部层级，粗/细粒度都可直接查询
+    print("dendrogram_file:", DENDROGRAM_FILE)
 
     # -------- 5. 打印耗时 ----------------------------------------------------
     print(f'Exec time: {round(end_time - start_time, 2)} seconds')
@@ -2,6 +2,23 @@ import matplotlib.pyplot as plt
 import networkx as nx
 from collections import defaultdict
 
+import numpy as np
+
+from graph_loader import load_edge_arrays, iter_weighted_edges
+from graph_layout import cached_community_layout
+from graph_raster import render_raster
+
+# 布局方式："spring" 为 nx.spring_layout 全图布局（仅适合小图）；
+# "community" 先布局社区图、再在各社区区域内摆放成员（大图），结果缓存在 backup/layout-cache；
+# "auto" 按节点数自动选择
+LAYOUT_MODE      = "auto"
+SPRING_MAX_NODES = 5000
+# 绘制方式："matplotlib" 为 nx.draw_networkx_*（逐个节点 / 边创建绘图对象，仅适合小图）；
+# "raster" 直接在 NumPy 像素缓冲区上累加边密度与节点颜色（大图）；
+# AGGREGATE_EDGES 为 True 时（仅 raster）社区间的边聚合为社区质心之间的一条线
+RENDER_BACKEND   = "matplotlib"
+AGGREGATE_EDGES  = False
+
 # 读取社区检测结果
 node_community = {}
 with open('backup/result-impl.txt', 'r') as f:
@@ -20,35 +37,52 @@ G.add_nodes_from(node_community.keys())
 #for node in G.nodes():
 #    G.add_edge(node, random.choice(list(G.nodes()))  # 随机连接
 def load_edges(path):
-    with open(path) as f:
-        for line in f:
-            u, v, w = line.strip().split()
-            G.add_edge(int(u), int(v), weight=float(w))
-load_edges('data/snn_df.txt')  # 替换为你的边数据文件
+    src, dst, w = load_edge_arrays(path) #从文件 snn_df.txt 加载边数据（格式为 起点 终点 权重），带二进制缓存
+    return src, dst, w
+edges = load_edges('data/snn_df.txt')  # 替换为你的边数据文件
 
 # 生成布局（力导向布局模拟UMAP效果）
-pos = nx.spring_layout(G, seed=42, iterations=50)
-
-# 按社区分配颜色
-community_colors = defaultdict(list)
-for node, comm in node_community.items():
-    community_colors[comm].append(node)
-
-# 绘制图形
-plt.figure(figsize=(12, 8))
-for comm, nodes in community_colors.items():
-    nx.draw_networkx_nodes(
-        G, pos,
-        nodelist=nodes,
-        node_size=20,
-        node_color=plt.cm.tab20(comm % 20),
-        label=f'Community {comm}'
-    )
-nx.draw_networkx_edges(G, pos, alpha=0.1, width=0.5)
-plt.title('Louvain Community Detection Visualization')
-plt.legend(scatterpoints=1, frameon=False, fontsize=8)
-plt.axis('off')
-plt.savefig('louvain_3_impl_vis.png', dpi=300, bbox_inches='tight')
-plt.close()
+nodes  = np.fromiter(node_community.keys(), dtype=np.int64, count=len(node_community))
+labels = np.fromiter(node_community.values(), dtype=np.int64, count=len(node_community))
+num_nodes  = len(np.union1d(nodes, np.concatenate(edges[:2])))
+use_spring = LAYOUT_MODE == "spring" or (LAYOUT_MODE == "auto" and num_nodes <= SPRING_MAX_NODES)
+if use_spring or RENDER_BACKEND == "matplotlib":  # 栅格化 + 社区布局时不需要构建 networkx 图
+    G.add_weighted_edges_from(iter_weighted_edges(*edges))
+if use_spring:
+    pos = nx.spring_layout(G, seed=42, iterations=50)
+    node_ids = np.array(sorted(pos), dtype=np.int64)
+    xy = np.array([pos[v] for v in node_ids.tolist()])
+else:
+    node_ids, xy = cached_community_layout(*edges, nodes, labels, seed=42, iterations=50)
+    pos = dict(zip(node_ids.tolist(), xy.tolist())) if RENDER_BACKEND == "matplotlib" else None
+
+if RENDER_BACKEND == "raster":
+    node_labels = np.full(len(node_ids), -1, dtype=np.int64)  # 不在划分结果中的节点记为 -1（灰色）
+    node_labels[np.searchsorted(node_ids, nodes)] = labels
+    render_raster('louvain_3_impl_vis.png', xy, node_labels,
+                  np.searchsorted(node_ids, edges[0]), np.searchsorted(node_ids, edges[1]), edges[2],
+                  aggregate_inter=AGGREGATE_EDGES)
+else:
+    # 按社区分配颜色
+    community_colors = defaultdict(list)
+    for node, comm in node_community.items():
+        community_colors[comm].append(node)
+
+    # 绘制图形
+    plt.figure(figsize=(12, 8))
+    for comm, nodes in community_colors.items():
+        nx.draw_networkx_nodes(
+            G, pos,
+            nodelist=nodes,
+            node_size=20,
+            node_color=plt.cm.tab20(comm % 20),
+            label=f'Community {comm}'
+        )
+    nx.draw_networkx_edges(G, pos, alpha=0.1, width=0.5)
+    plt.title('Louvain Community Detection Visualization')
+    plt.legend(scatterpoints=1, frameon=False, fontsize=8)
+    plt.axis('off')
+    plt.savefig('louvain_3_impl_vis.png', dpi=300, bbox_inches='tight')
+    plt.close()
 
 print("可视化结果已保存为 louvain_3_impl_vis.png")
\ No newline at end of file
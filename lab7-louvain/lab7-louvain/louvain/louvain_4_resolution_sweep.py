@@ -0,0 +1,105 @@
+# --------------------------- Louvain 分辨率扫描 -------------------------------
+# 图只读取、解析一次，放入共享内存供进程池只读共享；每个任务跑一个 (引擎, γ)：
+#   api  : community_louvain.best_partition(G, resolution=γ)（同 louvain_1_api_large.py）
+#   impl : louvain_3_impl.LouvainCSR(G, resolution=γ)
+# 输出每个 γ 的社区数 / 模块度 / 耗时表格，以及全部划分结果（一个 .npz 文件）。
+# -----------------------------------------------------------------------------
+
+import contextlib             # 屏蔽子进程中算法的逐轮打印
+import io
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from graph_loader import load_edge_arrays
+from louvain_3_impl import CSRGraph, LouvainCSR, build_csr, csr_modularity
+from louvain_parallel import SharedArrays
+
+# --------------------------- 全局参数 ----------------------------------------
+INPUT_FILE        = 'data/snn_df.txt'                  # 边列表文件
+RESOLUTIONS       = [0.3, 0.5, 0.7, 1.0, 1.5, 2.0]     # 待扫描的 γ
+ENGINES           = ["api", "impl"]                    # 参与扫描的引擎
+WORKERS           = os.cpu_count()                     # 进程数
+SEED              = 42                                 # 两个引擎共用的随机种子
+OUTPUT_TABLE      = "backup/resolution-sweep.tsv"      # γ → 社区数 / 模块度 / 耗时
+OUTPUT_PARTITIONS = "backup/resolution-sweep.npz"      # 全部划分：labels[i] 对应 (engines[i], resolutions[i])
+
+# --------------------------- 子进程 ------------------------------------------
+_GRAPH = {}                   # 子进程内：共享的 CSR 数组，以及按需构建的 networkx 图
+
+def _init_worker(spec):
+    _GRAPH.update(SharedArrays.attach(spec, _GRAPH.setdefault("_shm", [])))
+
+def _networkx_graph():                                 # api 引擎用，每个子进程只构建一次
+    if "nx" not in _GRAPH:
+        import networkx as nx
+        indptr, indices, weights = _GRAPH["indptr"], _GRAPH["indices"], _GRAPH["weights"]
+        n = len(indptr) - 1
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        keep = indices >= rows                         # 每条无向边只取一次
+        G = nx.Graph()
+        G.add_nodes_from(range(n))
+        G.add_weighted_edges_from(zip(rows[keep].tolist(), indices[keep].tolist(), weights[keep].tolist()))
+        _GRAPH["nx"] = G
+    return _GRAPH["nx"]
+
+def _run_one(task):                                    # task: (引擎, γ)
+    engine, resolution = task
+    indptr, indices, weights = _GRAPH["indptr"], _GRAPH["indices"], _GRAPH["weights"]
+    n = len(indptr) - 1
+    if engine == "api":
+        G = _networkx_graph()                          # 建图时间不计入算法耗时
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine == "api":
+            from community import community_louvain
+            partition = community_louvain.best_partition(G, resolution=resolution, random_state=SEED)
+            labels = np.fromiter((partition[i] for i in range(n)), dtype=np.int64, count=n)
+        else:
+            algorithm = LouvainCSR(CSRGraph(_GRAPH["node_ids"], indptr, indices, weights),
+                                   resolution=resolution, seed=SEED)
+            algorithm.execute()
+            labels = algorithm.get_labels()
+    runtime = time.time() - start_time
+
+    _, labels = np.unique(labels, return_inverse=True)  # 社区重编号为 0..C-1
+    Q = csr_modularity(indptr, indices, weights, labels)  # 两个引擎用同一口径（γ=1）计算模块度
+    return engine, resolution, labels.astype(np.int32), int(labels.max()) + 1 if n else 0, Q, runtime
+
+# --------------------------- 主程序 ------------------------------------------
+if __name__ == '__main__':
+    # -------- 1. 读图（只解析一次），放入共享内存 -----------------------------
+    G = build_csr(*load_edge_arrays(INPUT_FILE))
+    shared = SharedArrays(node_ids=G.node_ids, indptr=G.indptr, indices=G.indices, weights=G.weights)
+    tasks = [(engine, resolution) for resolution in RESOLUTIONS for engine in ENGINES]
+
+    # -------- 2. 进程池并行跑全部 (引擎, γ) ------------------------------------
+    start_time = time.time()
+    try:
+        with Pool(min(WORKERS, len(tasks)), initializer=_init_worker, initargs=(shared.spec(),)) as pool:
+            results = []
+            for result in pool.imap(_run_one, tasks):
+                results.append(result)
+                print(f">> done engine:{result[0]} resolution:{result[1]} ({len(results)}/{len(tasks)})")
+    finally:
+        shared.close()
+    end_time = time.time()
+
+    # -------- 3. 输出表格 ----------------------------------------------------
+    header = "engine\tresolution\tcommunities\tmodularity\truntime_s"
+    rows = [f"{engine}\t{resolution}\t{C}\t{Q:.6f}\t{runtime:.2f}"
+            for engine, resolution, _, C, Q, runtime in results]
+    print("\n".join([header] + rows))
+    with open(OUTPUT_TABLE, "w") as fw:
+        fw.write("\n".join([header] + rows) + "\n")
+
+    # -------- 4. 保存全部划分 --------------------------------------------------
+    np.savez_compressed(OUTPUT_PARTITIONS,
+                        node_ids=G.node_ids,
+                        engines=np.array([r[0] for r in results]),
+                        resolutions=np.array([r[1] for r in results]),
+                        labels=np.stack([r[2] for r in results]) if results else np.empty((0, 0), np.int32))
+    print("output_file:", OUTPUT_TABLE, OUTPUT_PARTITIONS)
+    print(f'Exec time: {round(end_time - start_time, 2)} seconds')
@@ -0,0 +1,176 @@
+# --------------------------- Louvain 性能基准 ---------------------------------
+# 生成规模递增的 planted‑partition 合成图（带真实社区标签），也可加入 data/snn_df.txt；
+# 对每张图分别运行：
+#   api      : community_louvain.best_partition（同 louvain_1_api_large.py）
+#   impl     : louvain_3_impl.Louvain（邻接字典后端）
+#   impl-csr : louvain_3_impl.LouvainCSR（NumPy CSR 后端）
+# 记录读图耗时、每个 pass 的 Phase‑I / Phase‑II 耗时、峰值 RSS、模块度、与真实标签的 NMI，
+# 结果写成 JSON，便于跟踪性能回退与规模拐点。
+# -----------------------------------------------------------------------------
+
+import contextlib             # 屏蔽算法的逐轮打印
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource               # ru_maxrss：进程峰值常驻内存
+import time
+
+import numpy as np
+
+# --------------------------- 全局参数 ----------------------------------------
+SIZES        = [1_000, 10_000, 100_000]   # 合成图顶点数
+AVG_DEGREE   = 20                         # 合成图平均度
+COMMUNITY    = 100                        # 合成图每个社区的顶点数
+MIXING       = 0.2                        # 社区间边的比例 μ（越大越难划分）
+REAL_GRAPHS  = ['data/snn_df.txt']        # 真实数据（无真实标签，不计算 NMI）；不存在则跳过
+ENGINES      = ["api", "impl", "impl-csr"]
+RESOLUTION   = 1.0
+SEED         = 42
+USE_CACHE    = False                      # False：读图耗时包含文本解析；True：走 .npz 缓存
+BENCH_DIR    = "backup/bench"             # 合成图边列表的存放目录
+OUTPUT_FILE  = "backup/benchmark.json"
+
+# --------------------------- 合成图 ------------------------------------------
+def planted_partition(n, avg_degree, community, mixing, seed):
+    # 返回 (src, dst, w, truth)：每条边以 1-μ 的概率落在起点所在社区内，否则随机连到任意顶点
+    rng = np.random.default_rng(seed)
+    m = n * avg_degree // 2
+    truth = np.arange(n) // community
+    src = rng.integers(0, n, m)
+    inside = rng.random(m) >= mixing
+    dst = np.where(inside,
+                   truth[src] * community + rng.integers(0, community, m),  # 同社区内随机一点
+                   rng.integers(0, n, m))
+    dst = np.minimum(dst, n - 1)                         # 最后一个社区可能不满
+    keep = src != dst                                   # 去掉自环
+    w = np.round(rng.uniform(0.1, 1.0, m), 3)
+    return src[keep], dst[keep], w[keep], truth
+
+def write_edge_list(path, src, dst, w):                 # 与 snn_df.txt 相同的 “u v w” 文本格式
+    np.savetxt(path, np.column_stack([src, dst, w]), fmt=["%d", "%d", "%.3f"], delimiter=" ")
+
+# --------------------------- 评价指标 ----------------------------------------
+def nmi(labels_a, labels_b):                            # 归一化互信息（算术平均归一化）
+    _, a = np.unique(labels_a, return_inverse=True)
+    _, b = np.unique(labels_b, return_inverse=True)
+    n = len(a)
+    pairs, counts = np.unique(a.astype(np.int64) * (b.max() + 1) + b, return_counts=True)
+    pa = np.bincount(a) / n
+    pb = np.bincount(b) / n
+    pab = counts / n
+    mi = float((pab * np.log(pab / (pa[pairs // (b.max() + 1)] * pb[pairs % (b.max() + 1)]))).sum())
+    ha = float(-(pa * np.log(pa)).sum())
+    hb = float(-(pb * np.log(pb)).sum())
+    return 1.0 if ha + hb == 0 else 2 * mi / (ha + hb)
+
+# --------------------------- 单次运行（独立子进程） ---------------------------
+def _timed(fn, log, key):                               # 包装 first_stage / second_stage，记录每次耗时
+    def wrapper():
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        if key == "phase1_s":
+            log.append({"pass": len(log) + 1, "phase1_s": elapsed, "phase2_s": None})
+        else:
+            log[-1]["phase2_s"] = elapsed
+        return result
+    return wrapper
+
+def run_one(path, engine):
+    # 在全新子进程中执行，读图耗时与峰值 RSS 只反映本引擎自己用到的结构；
+    # 返回 (记录, 原始顶点 id, 社区标签)，模块度 / NMI 由父进程统一计算
+    from graph_loader import load_edge_arrays, to_adjacency, to_networkx
+    from louvain_3_impl import Louvain, LouvainCSR, build_csr
+
+    random.seed(SEED)
+    passes = []
+    start = time.perf_counter()
+    src, dst, w = load_edge_arrays(path, use_cache=USE_CACHE)
+    if engine == "api":
+        G = to_networkx(src, dst, w)
+    elif engine == "impl":
+        G = to_adjacency(src, dst, w)
+    else:
+        G = build_csr(src, dst, w)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine == "api":
+            from community import community_louvain
+            partition = community_louvain.best_partition(G, resolution=RESOLUTION, random_state=SEED)
+            node_ids = np.fromiter(partition.keys(), dtype=np.int64, count=len(partition))
+            labels = np.fromiter(partition.values(), dtype=np.int64, count=len(partition))
+        else:
+            if engine == "impl":
+                algorithm = Louvain(G, resolution=RESOLUTION)
+            else:
+                algorithm = LouvainCSR(G, resolution=RESOLUTION, seed=SEED)
+            algorithm.first_stage  = _timed(algorithm.first_stage, passes, "phase1_s")
+            algorithm.second_stage = _timed(algorithm.second_stage, passes, "phase2_s")
+            communities = algorithm.execute()
+            node_ids = np.array([v for comm in communities for v in comm], dtype=np.int64)
+            labels = np.repeat(np.arange(len(communities)), [len(comm) for comm in communities])
+    run_s = time.perf_counter() - start
+
+    record = {
+        "graph": path,
+        "nodes": int(len(node_ids)),
+        "edges": int(len(src)),
+        "engine": engine,
+        "load_s": round(load_s, 4),
+        "run_s": round(run_s, 4),
+        "passes": [{k: (round(v, 4) if isinstance(v, float) else v) for k, v in p.items()} for p in passes],
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # Linux 下单位为 KB
+    }
+    return record, node_ids, labels
+
+def score(record, node_ids, labels, csr, truth):        # 在父进程中按同一 CSR 口径补上模块度 / 社区数 / NMI
+    from louvain_3_impl import csr_modularity
+
+    order = np.argsort(node_ids)
+    labels = labels[order][np.searchsorted(node_ids[order], csr.node_ids)]  # 对齐到 csr 的顶点次序
+    _, labels = np.unique(labels, return_inverse=True)
+    record["modularity"]  = round(csr_modularity(csr.indptr, csr.indices, csr.weights, labels), 6)
+    record["communities"] = int(labels.max()) + 1 if len(labels) else 0
+    record["nmi"] = None
+    if truth is not None:                               # truth 按原始顶点 id 索引
+        record["nmi"] = round(nmi(labels, truth[csr.node_ids]), 6)
+    return record
+
+# --------------------------- 主程序 ------------------------------------------
+if __name__ == '__main__':
+    from graph_loader import load_edge_arrays
+    from louvain_3_impl import build_csr
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    graphs = []                                         # [(边列表路径, 真实标签或 None)]
+    for n in SIZES:
+        path = os.path.join(BENCH_DIR, f"planted_{n}.txt")
+        src, dst, w, truth = planted_partition(n, AVG_DEGREE, COMMUNITY, MIXING, SEED)
+        write_edge_list(path, src, dst, w)
+        graphs.append((path, truth))
+    graphs += [(path, None) for path in REAL_GRAPHS if os.path.exists(path)]
+
+    # spawn + 每个任务一个新进程：互不干扰，峰值 RSS 不含父进程的内存
+    ctx = multiprocessing.get_context("spawn")
+    records = []
+    for path, truth in graphs:
+        csr = build_csr(*load_edge_arrays(path, use_cache=USE_CACHE))  # 评分用，不计入任何引擎的耗时与内存
+        for engine in ENGINES:
+            with ctx.Pool(1, maxtasksperchild=1) as pool:
+                try:
+                    record = score(*pool.apply(run_one, (path, engine)), csr, truth)
+                except Exception as exc:                # 某个引擎失败（如缺少依赖）不影响其余结果
+                    record = {"graph": path, "engine": engine, "error": repr(exc)}
+            records.append(record)
+            print(json.dumps(record, ensure_ascii=False))
+
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as fw:
+        json.dump({"config": {"sizes": SIZES, "avg_degree": AVG_DEGREE, "community": COMMUNITY,
+                              "mixing": MIXING, "resolution": RESOLUTION, "seed": SEED,
+                              "use_cache": USE_CACHE},
+                   "results": records}, fw, ensure_ascii=False, indent=4)
+    print("output_file:", OUTPUT_FILE)
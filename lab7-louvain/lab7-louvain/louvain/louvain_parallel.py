@@ -0,0 +1,194 @@
+# --------------------------- Louvain Phase‑I 多进程并行 ------------------------
+# 思路：先对当前图做贪心着色，同一颜色的顶点互不相邻；每个颜色类内的顶点
+# 基于同一份社区快照并行计算最佳去向（进程池 + 共享内存数组），再由主进程按
+# 固定次序逐个用最新的 Σtot 复核 ΔQ 并执行迁移。结果只取决于随机种子，与进程数无关。
+# -----------------------------------------------------------------------------
+
+from multiprocessing import Pool, shared_memory   # 进程池与共享内存
+
+import numpy as np
+
+from louvain_trace import Stopwatch, emit_sweep
+
+MIN_CHUNK = 256               # 颜色类小于 workers*MIN_CHUNK 时在主进程内计算，避免进程通信开销
+
+# --------------------------- ΔQ 计算核心 -------------------------------------
+def best_community(v, indptr, indices, weights, comm, k, tot, m, resolution, scratch):
+    # 串行内核（每次迁移后下一个顶点要看到最新的社区，无法跨顶点向量化）：
+    # indptr/comm/k/tot 为 Python list，indices/weights 为 NumPy 数组（每个顶点只切片一次）；
+    # scratch 为预分配的长度 n、全为 None 的 list，按社区累加 v 的边权，用完恢复为 None。
+    # 返回 (目标社区, ΔQ, v→目标社区边权, v→原社区边权, 计算 ΔQ 的候选社区数)；无候选时目标为 -1
+    start, end = indptr[v], indptr[v + 1]
+    if start == end:                                    # 孤立顶点无可移动社区
+        return -1, -1, 0.0, 0.0, 0
+    v_cid = comm[v]
+    k_v   = k[v]
+
+    cands = []                                          # 邻居社区（去重），及 v 到各社区的边权和
+    for u, w in zip(indices[start:end].tolist(), weights[start:end].tolist()):
+        c = comm[u]
+        s = scratch[c]
+        if s is None:
+            cands.append(c)
+            scratch[c] = w
+        else:
+            scratch[c] = s + w
+
+    m2 = 2 * m                                          # 同 Louvain._best_move，ΔQ 为模块度单位
+    k_v_in2  = scratch[v_cid] or 0.0
+    delta_Q2 = (-k_v_in2 + resolution * k_v * (tot[v_cid] - k_v) / m2) / m
+    best, best_Q, best_kin, n_cand = -1, -1, 0.0, 0
+    for c in cands:
+        k_v_in = scratch[c]
+        scratch[c] = None
+        if c == v_cid:                                  # 同社区不作为候选
+            continue
+        n_cand += 1
+        delta_Q = (k_v_in - resolution * k_v * tot[c] / m2) / m + delta_Q2
+        if best < 0 or delta_Q > best_Q:
+            best, best_Q, best_kin = c, delta_Q, k_v_in
+    return best, best_Q, best_kin, k_v_in2, n_cand
+
+def best_communities(vertices, indptr, indices, weights, comm, k, tot, m, resolution):
+    # 并行内核：一批互不相邻的顶点基于同一份社区快照，整批向量化计算（全部为 NumPy 数组）；
+    # 返回 (目标社区, v→目标社区边权, v→原社区边权, 候选社区总数)，ΔQ 不为正的顶点目标为 -1
+    n = len(indptr) - 1
+    starts = indptr[vertices]
+    deg = indptr[vertices + 1] - starts
+    local = np.repeat(np.arange(len(vertices)), deg)    # 每条边所属的批内顶点
+    pos = np.arange(int(deg.sum())) + np.repeat(starts - (np.cumsum(deg) - deg), deg)
+
+    # (批内顶点, 邻居社区) 聚合边权：整批只做一次 unique + bincount
+    keys, inv = np.unique(local * n + comm[indices[pos]], return_inverse=True)
+    k_v_in = np.bincount(inv, weights=weights[pos], minlength=len(keys))
+    row, cids = keys // n, keys % n
+    v_cid, k_v = comm[vertices][row], k[vertices][row]
+    own = cids == v_cid
+    k_v_in2 = np.zeros(len(vertices))
+    k_v_in2[row[own]] = k_v_in[own]
+
+    delta_Q = (k_v_in - k_v_in2[row] - resolution * k_v * (tot[cids] - tot[v_cid] + k_v) / (2 * m)) / m
+    delta_Q[own] = -np.inf                              # 同社区不作为候选
+    order = np.lexsort((-delta_Q, row))                 # 每个顶点 ΔQ 最大的候选排在最前
+    first = order[np.flatnonzero(np.r_[True, row[order][1:] != row[order][:-1]])] if len(order) else order
+    first = first[delta_Q[first] > 0.0]
+
+    targets = np.full(len(vertices), -1, dtype=np.int64)
+    kin_t   = np.zeros(len(vertices))
+    targets[row[first]], kin_t[row[first]] = cids[first], k_v_in[first]
+    return targets, kin_t, k_v_in2, int(np.count_nonzero(~own))
+
+# --------------------------- 贪心着色 ----------------------------------------
+def greedy_coloring(indptr, indices, order):           # order: 访问顺序，返回按颜色分组的顶点数组
+    color = np.full(len(indptr) - 1, -1, dtype=np.int64)
+    for v in order:
+        used = set(color[indices[indptr[v]:indptr[v + 1]]].tolist())
+        c = 0
+        while c in used:                               # 取最小的未被邻居占用的颜色
+            c += 1
+        color[v] = c
+    order = np.asarray(order, dtype=np.int64)
+    return [order[color[order] == c] for c in range(int(color.max()) + 1)] if len(order) else []
+
+# --------------------------- 共享内存数组 ------------------------------------
+class SharedArrays:
+    # 把一组 NumPy 数组复制进共享内存；主进程与子进程通过名字挂载同一块内存
+    def __init__(self, **arrays):
+        self._blocks = {}
+        self.arrays  = {}
+        for name, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+            view[...] = arr
+            self._blocks[name] = shm
+            self.arrays[name]  = view
+
+    def spec(self):                                    # 子进程挂载所需的 (名字, 形状, 类型)
+        return {name: (self._blocks[name].name, a.shape, a.dtype.str) for name, a in self.arrays.items()}
+
+    @staticmethod
+    def attach(spec, handles):                         # 子进程内按 spec 挂载；handles 保存 shm 引用，防止被回收
+        arrays = {}
+        for name, (shm_name, shape, dtype) in spec.items():
+            shm = shared_memory.SharedMemory(name=shm_name)
+            handles.append(shm)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        return arrays
+
+    def close(self):
+        self.arrays = {}
+        for shm in self._blocks.values():
+            shm.close()
+            shm.unlink()
+        self._blocks = {}
+
+_WORKER = {}                  # 子进程内：挂载的共享数组、m 与分辨率
+
+def _init_worker(spec, m, resolution=1.0):
+    _WORKER.update(SharedArrays.attach(spec, _WORKER.setdefault("_shm", [])))
+    _WORKER["m"] = m
+    _WORKER["resolution"] = resolution
+
+def _best_moves(vertices, state=None):                 # 对一批互不相邻的顶点计算最佳去向
+    g = _WORKER if state is None else state
+    return best_communities(vertices, g["indptr"], g["indices"], g["weights"],
+                            g["comm"], g["k"], g["tot"], g["m"], g["resolution"])
+
+# --------------------------- 并行 Phase‑I -----------------------------------
+def parallel_first_stage(louvain, workers, max_iter, rng, delta_q_tol=0.0, min_move_ratio=0.0):
+    # louvain: LouvainCSR 实例；返回本 pass 是否有模块度提升
+    indptr, m, resolution = louvain._indptr, louvain._m, louvain._resolution
+    visit_sequence = list(range(len(indptr) - 1))
+    rng.shuffle(visit_sequence)                         # 与串行版本一致：打乱访问顺序
+    classes = greedy_coloring(indptr, louvain._indices, visit_sequence)
+    print(f"0=> phaseI parallel | workers:{workers} colors:{len(classes)}")
+
+    shared = SharedArrays(indptr=indptr, indices=louvain._indices, weights=louvain._weights,
+                          k=louvain._k, comm=louvain._comm, tot=louvain._tot)
+    comm, tot, k = shared.arrays["comm"], shared.arrays["tot"], shared.arrays["k"]
+    local = dict(shared.arrays, m=m, resolution=resolution)
+    mod_inc = False
+    try:
+        with Pool(workers, initializer=_init_worker, initargs=(shared.spec(), m, resolution)) as pool:
+            for iter_times_phaseI in range(1, max_iter + 1):
+                moves = evaluations = 0
+                if louvain._observers:
+                    watch = Stopwatch()
+                for vertices in classes:
+                    if len(vertices) < workers * MIN_CHUNK:     # 小颜色类：主进程直接算
+                        parts = [_best_moves(vertices, local)]
+                    else:                                       # 大颜色类：均分给各进程
+                        parts = pool.map(_best_moves, np.array_split(vertices, workers * 4))
+                    targets = np.concatenate([p[0] for p in parts])
+                    kin_t   = np.concatenate([p[1] for p in parts])
+                    kin_o   = np.concatenate([p[2] for p in parts])
+                    evaluations += sum(p[3] for p in parts)
+
+                    # 按固定次序用最新 Σtot 复核 ΔQ，仍为正才迁移
+                    for v, cid, k_t, k_o in zip(vertices.tolist(), targets.tolist(),
+                                                kin_t.tolist(), kin_o.tolist()):
+                        if cid < 0:
+                            continue
+                        v_cid, k_v = comm[v], k[v]
+                        delta_Q = (k_t - k_o - resolution * k_v * (tot[cid] - tot[v_cid] + k_v) / (2 * m)) / m
+                        if delta_Q > delta_q_tol:
+                            comm[v] = cid
+                            tot[cid]   += k_v
+                            tot[v_cid] -= k_v
+                            moves += 1
+                print(f"\tphaseI iter:{iter_times_phaseI} (max:{max_iter}) | moves:{moves}")
+                louvain._evaluations += evaluations
+                if louvain._observers:                  # 观察者读取的是 louvain 上的数组，先同步一次
+                    louvain._comm, louvain._tot = comm.copy(), tot.copy()
+                    emit_sweep(louvain, iter_times_phaseI, len(visit_sequence), moves, evaluations, watch)
+                if moves:
+                    mod_inc = True
+                if moves <= min_move_ratio * len(visit_sequence):  # 整轮（几乎）没有节点移动则退出
+                    break
+        louvain._comm = comm.copy()                     # 拷回普通数组后释放共享内存
+        louvain._tot  = tot.copy()
+    finally:
+        comm = tot = k = local = None                   # 先丢弃所有视图，共享内存才能关闭
+        shared.close()
+    return mod_inc
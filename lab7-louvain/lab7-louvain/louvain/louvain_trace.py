@@ -0,0 +1,56 @@
+# --------------------------- Louvain 运行追踪 --------------------------------
+# 观察者为任意可调用对象 observer(event)，event 为 dict，两种事件：
+#   sweep: 每轮 Phase‑I 扫描（队列模式下整个队列算一轮）
+#          {"event", "pass", "sweep", "visited", "moves", "evaluations",
+#           "modularity", "communities", "wall_s", "cpu_s"}
+#   pass : 每个 pass 结束（Phase‑I + Phase‑II）
+#          {"event", "pass", "phase1_wall_s", "phase1_cpu_s", "phase2_wall_s", "phase2_cpu_s",
+#           "modularity", "communities"}
+# 算法只在注册了观察者时才计时、计算模块度，未注册时没有额外开销。
+# -----------------------------------------------------------------------------
+
+import json
+import time
+
+class Stopwatch:                                        # 同时记录墙钟时间与 CPU 时间
+    __slots__ = ("_wall", "_cpu")
+
+    def __init__(self):
+        self._wall = time.perf_counter()
+        self._cpu  = time.process_time()
+
+    def elapsed(self):                                  # 返回 (wall_s, cpu_s)
+        return time.perf_counter() - self._wall, time.process_time() - self._cpu
+
+class JsonLinesTrace:                                   # 观察者：每个事件追加一行 JSON
+    def __init__(self, path):
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def __call__(self, event):
+        self._fh.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._fh.flush()                                # 长时间运行时可随时 tail -f 查看
+
+    def close(self):
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def emit_sweep(louvain, sweep, visited, moves, evaluations, watch):
+    wall, cpu = watch.elapsed()
+    event = {"event": "sweep", "pass": louvain._pass, "sweep": sweep, "visited": visited,
+             "moves": moves, "evaluations": evaluations, "modularity": louvain.modularity(),
+             "communities": louvain.community_count(), "wall_s": wall, "cpu_s": cpu}
+    for observer in louvain._observers:
+        observer(event)
+
+def emit_pass(louvain, phase1, phase2):                 # phase1/phase2: (wall_s, cpu_s)，未执行 Phase‑II 时为 None
+    event = {"event": "pass", "pass": louvain._pass,
+             "phase1_wall_s": phase1[0], "phase1_cpu_s": phase1[1],
+             "phase2_wall_s": phase2[0] if phase2 else None, "phase2_cpu_s": phase2[1] if phase2 else None,
+             "modularity": louvain.modularity(), "communities": louvain.community_count()}
+    for observer in louvain._observers:
+        observer(event)
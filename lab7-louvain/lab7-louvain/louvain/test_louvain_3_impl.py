@@ -0,0 +1,44 @@
+# --------------------------- louvain_3_impl 回归测试（pytest） ------------------
+# 在固定种子的植入划分图上运行，不依赖 data/ 下的数据文件。
+# -----------------------------------------------------------------------------
+
+import contextlib
+import io
+import random
+
+import numpy as np
+
+from graph_loader import to_adjacency
+from louvain_3_impl import Louvain
+
+def planted_graph(n=600, size=30, p_in=0.3, p_out=0.005, seed=0):  # 返回 (src, dst, w)
+    rng = np.random.default_rng(seed)
+    u, v = np.triu_indices(n, 1)
+    same = u // size == v // size
+    keep = rng.random(len(u)) < np.where(same, p_in, p_out)
+    return u[keep], v[keep], np.ones(int(keep.sum()))
+
+def run(louvain):                                       # 屏蔽逐轮打印
+    with contextlib.redirect_stdout(io.StringIO()):
+        return louvain.execute()
+
+def test_warm_start_never_below_seed():
+    src, dst, w = planted_graph()
+    random.seed(0)
+    cold = Louvain(to_adjacency(src, dst, w))
+    partition = {v: cid for cid, comm in enumerate(run(cold)) for v in comm}
+
+    for delta in ([(0, 599, 1.0)], [(0, 599, 1.0), (5, 300, 2.0)], [(1, 2, 5.0), (600, 3, 1.0)]):
+        with contextlib.redirect_stdout(io.StringIO()):
+            warm = Louvain(to_adjacency(src, dst, w), partition=partition, delta_edges=delta)
+        seed_q = warm.modularity()
+        run(warm)
+        assert warm.modularity() >= seed_q - 1e-12
+
+def test_queue_drains_before_budget():
+    src, dst, w = planted_graph()
+    random.seed(0)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        Louvain(to_adjacency(src, dst, w), fast_local_moving=True).execute()
+    assert "stopped by budget" not in out.getvalue()
@@ -0,0 +1,211 @@
+# --------------------------- 关系三元组存储（抽取结果 → 图） ---------------------
+# 把大模型关系抽取的输出（result.json / result2.json / *.jsonl 中的 "(头实体,关系,尾实体)" 文本）
+# 流式解析成三元组，实体与关系名各自映射为整数 id，去重后存成 NumPy 数组：
+#   spo   : (n, 3) int64，按 (s, p, o) 排序；count 为同一三元组被抽取到的次数
+#   索引  : SPO / POS / OSP 三种排列 + 首列的偏移数组，首列定位 O(1)，其余列在区间内二分
+# 再按实体对聚合成带权边列表 / CSR，直接交给 louvain_3_impl 或 community_louvain。
+# 读取抽取结果（ingest）用到与 re_api.py 共用的 json_stream.py，需把其所在目录加入 PYTHONPATH：
+#   PYTHONPATH=../../../大模型知识/大模型关系抽取/baichuan/baichuan python triple_store.py
+# -----------------------------------------------------------------------------
+
+import array                  # 解析阶段紧凑地暂存 id
+import os
+import re
+import time
+
+import numpy as np
+
+# --------------------------- 全局参数 ----------------------------------------
+INPUT_FILES  = ['../../../大模型知识/大模型关系抽取/baichuan/baichuan/result2.json']  # 抽取结果（JSON 数组或 JSON-lines）
+TEXT_FIELDS  = ('result', 'output')       # 依次查找的模型输出字段
+STORE_FILE   = "backup/triple-store.npz"
+EDGE_FILE    = "data/kg_edges.txt"        # 与 snn_df.txt 相同的 “u v w” 格式
+ENTITY_FILE  = "data/kg_entities.tsv"     # “实体 id  实体名”
+RESULT_FILE  = "backup/result-kg.txt"     # “实体名  社区 id”
+
+# --------------------------- 解析 --------------------------------------------
+QUOTED = re.compile(r"\(\s*'((?:[^'\\]|\\.)*)'\s*,\s*'((?:[^'\\]|\\.)*)'\s*,\s*'((?:[^'\\]|\\.)*)'\s*\)")  # ('h', 'r', 't')
+PLAIN  = re.compile(r"[({]([^(){}]+)[)}]")                                                                # (h,r,t) / {h，r，t}
+SEP    = re.compile(r"\s*[,，]\s*")
+
+def parse_triples(text):                                # 从一段模型输出中解析出 [(头实体, 关系, 尾实体)]
+    found = QUOTED.findall(text)
+    if found:
+        return [tuple(part.strip() for part in triple) for triple in found]
+    triples = []
+    for group in PLAIN.findall(text):
+        parts = [part.strip().strip("'\"") for part in SEP.split(group.strip(), maxsplit=2)]
+        if len(parts) == 3 and all(parts):
+            triples.append(tuple(parts))
+    return triples
+
+# --------------------------- 字符串驻留 --------------------------------------
+class Interner:                                         # 字符串 ↔ 连续整数 id
+    __slots__ = ("ids", "names")
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+
+    def intern(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def __len__(self):
+        return len(self.names)
+
+# --------------------------- 三元组存储 --------------------------------------
+ORDERS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}  # 三种索引的列顺序
+
+class TripleStore:
+    def __init__(self):
+        self.entities  = Interner()
+        self.relations = Interner()
+        self._raw   = array.array("q")                  # 未去重的 s, p, o 依次排列
+        self.spo    = np.empty((0, 3), dtype=np.int64)
+        self.count  = np.empty(0, dtype=np.int64)
+        self._index = {}
+
+    # ----------------------- 写入 --------------------------------------------
+    def add(self, head, relation, tail):
+        self._raw.extend((self.entities.intern(head), self.relations.intern(relation), self.entities.intern(tail)))
+
+    def add_text(self, text):                           # 解析一段模型输出，返回三元组个数
+        triples = parse_triples(text)
+        for head, relation, tail in triples:
+            self.add(head, relation, tail)
+        return len(triples)
+
+    def ingest(self, path, fields=TEXT_FIELDS):         # 流式读取一个抽取结果文件，返回 (记录数, 三元组数)
+        from json_stream import iter_json               # 与 re_api.py 共用的流式 JSON 读取（见文件头的 PYTHONPATH）
+        records = triples = 0
+        for record in iter_json(path):
+            records += 1
+            text = next((record[f] for f in fields if isinstance(record.get(f), str)), None)
+            if text:
+                triples += self.add_text(text)
+        return records, triples
+
+    def build(self):
+        # 合并新写入的三元组：已有的 (三元组, 次数) 与新三元组（次数 1）一起去重、累加次数，并重建三种索引
+        raw = np.frombuffer(self._raw, dtype=np.int64).reshape(-1, 3) if len(self._raw) else np.empty((0, 3), np.int64)
+        self._raw = array.array("q")
+        if len(raw):
+            spo, inv = np.unique(np.concatenate([self.spo, raw]), axis=0, return_inverse=True)  # 按 (s, p, o) 排序
+            count = np.concatenate([self.count, np.ones(len(raw), dtype=np.int64)])
+            self.spo, self.count = spo, np.bincount(inv.ravel(), weights=count, minlength=len(spo)).astype(np.int64)
+        self._index = {}
+        for name, cols in ORDERS.items():
+            perm = np.lexsort(tuple(self.spo[:, c] for c in reversed(cols))) if name != "spo" else np.arange(len(self.spo))
+            keys = np.ascontiguousarray(self.spo[perm][:, cols].T)  # (3, n)：按该索引次序排列的各列，查询时直接二分
+            size = len(self.relations) if cols[0] == 1 else len(self.entities)
+            self._index[name] = (perm, np.searchsorted(keys[0], np.arange(size + 1)), keys)
+        return self
+
+    def __len__(self):
+        return len(self.spo)
+
+    # ----------------------- 查询 --------------------------------------------
+    def match(self, s=None, p=None, o=None):
+        # 按模式查询，参数为 id 或 None（通配）；返回匹配三元组在 self.spo 中的下标
+        given = {0: s, 1: p, 2: o}
+        if s is None and p is None and o is None:
+            return np.arange(len(self.spo))
+        for name, cols in ORDERS.items():               # 选一个已知列恰好构成前缀的索引
+            k = 0
+            while k < 3 and given[cols[k]] is not None:
+                k += 1
+            if all(given[c] is None for c in cols[k:]):
+                break
+        perm, ptr, keys = self._index[name]
+        key = given[cols[0]]
+        if key < 0 or key >= len(ptr) - 1:
+            return perm[:0]
+        lo, hi = ptr[key], ptr[key + 1]                 # 首列：偏移数组直接定位
+        for j in range(1, k):                           # 其余已知列：在排好序的列视图上二分，不复制区间
+            column, value = keys[j, lo:hi], given[cols[j]]
+            lo, hi = lo + np.searchsorted(column, value, "left"), lo + np.searchsorted(column, value, "right")
+        return perm[lo:hi]
+
+    def find(self, head=None, relation=None, tail=None):  # 按名字查询，产出 (头实体, 关系, 尾实体, 次数)
+        ids = [None if name is None else interner.ids.get(name, -1)
+               for name, interner in ((head, self.entities), (relation, self.relations), (tail, self.entities))]
+        for i in self.match(*ids).tolist():
+            s, p, o = self.spo[i].tolist()
+            yield self.entities.names[s], self.relations.names[p], self.entities.names[o], int(self.count[i])
+
+    # ----------------------- 导出为图 ----------------------------------------
+    def edge_arrays(self, relations=None, weighted=True):
+        # 实体对 → 无向带权边 (src, dst, w)；w 为两实体间所有（指定）关系的出现次数之和，自环丢弃
+        rows = np.arange(len(self.spo))
+        if relations is not None:
+            rel_ids = [self.relations.ids[r] for r in relations if r in self.relations.ids]
+            rows = np.concatenate([self.match(p=r) for r in rel_ids]) if rel_ids else rows[:0]
+        s, o = self.spo[rows, 0], self.spo[rows, 2]
+        w = self.count[rows].astype(np.float64) if weighted else np.ones(len(rows))
+        keep = s != o
+        lo, hi = np.minimum(s[keep], o[keep]), np.maximum(s[keep], o[keep])
+        pairs, inv = np.unique(lo * len(self.entities) + hi, return_inverse=True)
+        return pairs // len(self.entities), pairs % len(self.entities), np.bincount(inv, weights=w[keep])
+
+    def to_csr(self, relations=None, weighted=True):    # louvain_3_impl.LouvainCSR 的输入
+        from louvain_3_impl import build_csr
+        return build_csr(*self.edge_arrays(relations, weighted))
+
+    def write_edge_list(self, path, relations=None, weighted=True):  # 供读取 snn_df.txt 格式的各脚本使用
+        src, dst, w = self.edge_arrays(relations, weighted)
+        np.savetxt(path, np.column_stack([src, dst, w]), fmt=["%d", "%d", "%g"], delimiter=" ")
+
+    # ----------------------- 持久化 ------------------------------------------
+    def save(self, path):
+        if len(self._raw):
+            self.build()
+        np.savez_compressed(path, spo=self.spo, count=self.count,
+                            entities=np.array(self.entities.names, dtype=object),
+                            relations=np.array(self.relations.names, dtype=object))
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with np.load(path, allow_pickle=True) as npz:
+            store.entities  = Interner(npz["entities"].tolist())
+            store.relations = Interner(npz["relations"].tolist())
+            store.spo, store.count = npz["spo"], npz["count"]
+        return store.build()
+
+# --------------------------- 主程序 ------------------------------------------
+if __name__ == '__main__':
+    from louvain_3_impl import LouvainCSR
+
+    # -------- 1. 流式解析抽取结果 ---------------------------------------------
+    start_time = time.time()
+    store = TripleStore()
+    for path in INPUT_FILES:
+        records, triples = store.ingest(path)
+        print(f">> {path} | records:{records} triples:{triples}")
+    store.build()
+    print(f">> entities:{len(store.entities)} relations:{len(store.relations)} unique triples:{len(store)}")
+    for path in (STORE_FILE, EDGE_FILE, ENTITY_FILE, RESULT_FILE):  # 只有抽取结果的新环境里输出目录可能不存在
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    store.save(STORE_FILE)
+
+    # -------- 2. 导出边列表与实体表 -------------------------------------------
+    store.write_edge_list(EDGE_FILE)
+    with open(ENTITY_FILE, "w", encoding="utf-8") as fw:
+        for i, name in enumerate(store.entities.names):
+            fw.write(f"{i}\t{name}\n")
+
+    # -------- 3. 直接在三元组图上做社区发现 -----------------------------------
+    algorithm = LouvainCSR(store.to_csr())
+    communities = sorted(algorithm.execute(), key=lambda x: -len(x))
+    with open(RESULT_FILE, "w", encoding="utf-8") as fw:
+        for cid, comm in enumerate(communities):
+            for v in comm:
+                fw.write(f"{store.entities.names[v]}\t{cid}\n")
+    for idx, comm in enumerate(communities[:10], 1):
+        print(f"Community {idx} :", [store.entities.names[v] for v in comm])
+    print("output_file:", STORE_FILE, EDGE_FILE, ENTITY_FILE, RESULT_FILE)
+    print(f'Exec time: {round(time.time() - start_time, 2)} seconds')
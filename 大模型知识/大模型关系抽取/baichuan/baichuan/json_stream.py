@@ -0,0 +1,26 @@
+from json import JSONDecoder
+
+# 流式 JSON 读取（re_api.py 读取 data2.json、lab7-louvain 的 triple_store.py 读取抽取结果共用）
+def iter_json(path, chunk_size=1 << 20):
+    # 逐个产出 JSON 数组或 JSON-lines 文件中的对象，按块读取文件，不把整个文件读入内存
+    decoder = JSONDecoder()
+    with open(path, "r", encoding="utf-8") as fh:
+        buf, pos, eof = '', 0, False
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,[':   # 跳过数组的分隔符
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except ValueError:                          # 当前块里的对象不完整，继续读
+                if eof:
+                    if buf[pos:].strip():
+                        raise
+                    return
+                chunk = fh.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield record
+            pos = end
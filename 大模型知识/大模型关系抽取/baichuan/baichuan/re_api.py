@@ -1,35 +1,198 @@
 from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
 import dashscope
 import ujson as json
-result=[]
+from json_stream import iter_json   # 流式读取输入，不把整个文件读入内存
+
+MODEL         = 'qwen1.5-32b-chat'
+MAX_IN_FLIGHT = 8             # 同时在途的请求数（线程数），1 即逐条串行调用
+RATE_LIMIT    = 5.0           # 令牌桶：平均每秒最多发出的请求数（按账号 QPS 配额设置）
+BURST         = 5             # 令牌桶容量：允许的瞬时突发请求数
+MAX_RETRIES   = 5             # 限流 / 服务端错误 / 网络异常时的最大重试次数
+BACKOFF_BASE  = 1.0           # 指数退避：第 i 次重试前等待 BACKOFF_BASE * 2**i 秒（带随机抖动）
+BACKOFF_MAX   = 60.0
+API_BASE_URL  = None          # 非空时改写 dashscope 的服务地址，例如本地桩服务 re_api_stub.py 的 http://127.0.0.1:8000/api/v1
+INPUT_FILE    = 'data2.json'
+OUTPUT_FILE   = 'result2.jsonl'  # 每完成一条追加一行；重跑时跳过其中已有的样本 id（断点续跑）
+EXPORT_FILE   = 'result2.json'   # 全部完成后按 id 排序导出为原来的 JSON 数组格式；None 则不导出
+CACHE_FILE    = 'cache/re_api_cache.sqlite'  # 持久化响应缓存：键为 hash(模型, instruction+input)
+
+class TokenBucket:
+    # 线程安全的令牌桶：每个请求取一个令牌，令牌按 rate 个/秒匀速补充，最多积攒 burst 个
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)                            # 在锁外等待，其他线程可继续检查
+
+bucket = TokenBucket(RATE_LIMIT, BURST)
+
+def _retryable(response):                               # 429 限流与 5xx 服务端错误值得重试，4xx 参数错误重试无意义
+    return response is None or response.status_code == HTTPStatus.TOO_MANY_REQUESTS or response.status_code >= 500
+
+def call_one(messages):
+    # 带限流与指数退避的单次调用；返回最后一次的 response，网络异常用尽重试则返回 None
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            response = dashscope.Generation.call(
+                MODEL,
+                messages=messages,
+                result_format='message',  # set the result is message format.
+            )
+        except Exception as exc:                        # 连接超时 / 断开等
+            print('Request failed (attempt %d): %r' % (attempt + 1, exc))
+            response = None
+        if not _retryable(response) or attempt == MAX_RETRIES:
+            return response
+        time.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+# --------------------------- 断点 / 缓存 -------------------------------------
+def load_checkpoint(path):
+    # 返回已完成的样本 id；上次中断留下的半行会被截掉，保证继续追加时每行都完整
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as fh:
+        data = fh.read()
+        if data and not data.endswith(b'\n'):
+            fh.truncate(data.rfind(b'\n') + 1)
+            data = data[:data.rfind(b'\n') + 1]
+    for line in data.decode('utf-8').splitlines():
+        if line.strip():
+            done.add(json.loads(line)['id'])
+    return done
+
+def cache_key(model, prompt):
+    return hashlib.sha256((model + '\n' + prompt).encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    # sqlite 单文件缓存，只在主线程读写；只缓存成功的响应
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, model TEXT, response TEXT)')
+
+    def get(self, key):
+        row = self.db.execute('SELECT response FROM cache WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, model, response):
+        self.db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', (key, model, response))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+# --------------------------- 调用与输出 --------------------------------------
+def process_sample(sample):
+    # 返回模型回答文本，失败返回 None（不写入结果，下次重跑会再次尝试）
+    prompt= sample['instruction'] + sample['input']
+    messages = [
+        {'role': 'user', 'content': prompt}]
+    response = call_one(messages)
+    if response is None:
+        return None
+    if response.status_code == HTTPStatus.OK:
+        return response['output']['choices'][0]['message']['content']
+    print('Sample id: %s, Request id: %s, Status code: %s, error code: %s, error message: %s' % (
+        sample['id'], response.request_id, response.status_code,
+        response.code, response.message
+    ))
+    return None
+
+def write_ready(pending, out, cache, limit, in_flight):
+    # 按输入顺序写出已完成的样本；在途 / 待写样本超过 limit 时阻塞等待最早的一个
+    written = failed = 0
+    while pending and (len(pending) > limit or pending[0][3] is not None or pending[0][2].done()):
+        sample, key, future, content = pending.popleft()
+        if content is None:
+            content = future.result()
+            if in_flight.get(key) is future:            # 结果已落入缓存（或失败），之后的同键样本不再共用该请求
+                del in_flight[key]
+            if content is None:
+                failed += 1
+                continue
+            cache.put(key, MODEL, content)
+        out.write(json.dumps({'id': sample['id'],
+                              'instruction': sample['instruction'],
+                              'input': sample['input'],
+                              'result': content}, ensure_ascii=False) + '\n')
+        out.flush()                                     # 逐条落盘，中断后可从 OUTPUT_FILE 续跑
+        written += 1
+    return written, failed
+
+def export_json(path, export_path):                     # JSON-lines → 按 id 排序的 JSON 数组（原 result2.json 格式）
+    records = {}
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                record = json.loads(line)
+                records[record['id']] = record
+    result = [{'instruction': r['instruction'], 'input': r['input'], 'result': r['result']}
+              for _, r in sorted(records.items(), key=lambda item: item[0])]
+    with open(export_path, "w", encoding='utf-8') as file:
+        file.write(json.dumps(result, ensure_ascii=False, indent=4))
 
 def call_with_messages():
-    with open('data2.json', "r",encoding="utf-8") as fh:
-        data = json.load(fh)
-    for sample in data:
-        instruction = sample['instruction']
-        input = sample['input']
-        prompt= instruction + input
-        messages = [
-            {'role': 'user', 'content': prompt}]
-        response = dashscope.Generation.call(
-            'qwen1.5-32b-chat',
-            messages=messages,
-            result_format='message',  # set the result is message format.
-        )
-        if response.status_code == HTTPStatus.OK:
-            result.append({'instruction':instruction,
-                           'input':input,
-                           'result':response['output']['choices'][0]['message']['content']})
-        else:
-            print('Request id: %s, Status code: %s, error code: %s, error message: %s' % (
-            response.request_id, response.status_code,
-            response.code, response.message
-        ))
-    json_data = json.dumps(result,ensure_ascii=False, indent=4)
-    with open("result2.json", "w",encoding = 'utf-8') as file:
-        file.write(json_data)
+    if API_BASE_URL:
+        dashscope.base_http_api_url = API_BASE_URL
+    done = load_checkpoint(OUTPUT_FILE)
+    cache = ResponseCache(CACHE_FILE)
+    pending = collections.deque()                       # (样本, 缓存键, future, 缓存命中的回答)，保持输入顺序
+    in_flight = {}                                      # {缓存键: future}：尚未写入缓存的请求，相同 prompt 共用
+    skipped = hits = shared = written = failed = 0
+    # 线程池控制在途请求数，令牌桶控制发送速率；pending 有上限，内存占用与数据集大小无关
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT) as pool, \
+                open(OUTPUT_FILE, "a", encoding="utf-8") as out:
+            for sample in iter_json(INPUT_FILE):
+                if sample['id'] in done:
+                    skipped += 1
+                    continue
+                key = cache_key(MODEL, sample['instruction'] + sample['input'])
+                content = cache.get(key)
+                if content is not None:
+                    hits += 1
+                    pending.append((sample, key, None, content))
+                elif key in in_flight:                  # 同一 prompt 已在途：等待同一个 future，不重复发送
+                    shared += 1
+                    pending.append((sample, key, in_flight[key], None))
+                else:
+                    in_flight[key] = pool.submit(process_sample, sample)
+                    pending.append((sample, key, in_flight[key], None))
+                w, f = write_ready(pending, out, cache, MAX_IN_FLIGHT * 4, in_flight)
+                written, failed = written + w, failed + f
+            w, f = write_ready(pending, out, cache, 0, in_flight)
+            written, failed = written + w, failed + f
+    finally:
+        cache.close()
+    print('written: %d, skipped (done): %d, cache hits: %d, shared in-flight: %d, failed: %d' % (
+        written, skipped, hits, shared, failed))
+    if EXPORT_FILE:
+        export_json(OUTPUT_FILE, EXPORT_FILE)
 
 
 if __name__ == '__main__':
-    call_with_messages()
\ No newline at end of file
+    call_with_messages()
@@ -1,26 +1,8 @@
-from http import HTTPStatus
-import dashscope
-import ujson as json
+from re_client import chat_loop
 
-
-def call_with_messages():
-    while(True):
-        inputs=input("请输入：")
-        messages = [
-            {'role': 'user', 'content': inputs}]
-        response = dashscope.Generation.call(
-                'qwen1.5-32b-chat',
-                messages=messages,
-                result_format='message',  # set the result is message format.
-        )
-        if response.status_code == HTTPStatus.OK:
-            print(response['output']['choices'][0]['message']['content'])
-        else:
-                print('Request id: %s, Status code: %s, error code: %s, error message: %s' % (
-                response.request_id, response.status_code,
-                response.code, response.message
-            ))
+# 请求经常驻服务转发给 dashscope，多人共用同一个限流配额，先启动：python re_server.py api
+SERVER_URL = 'http://127.0.0.1:8601/generate'
 
 
 if __name__ == '__main__':
-    call_with_messages()
\ No newline at end of file
+    chat_loop(SERVER_URL)
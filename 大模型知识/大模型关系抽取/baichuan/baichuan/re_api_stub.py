@@ -0,0 +1,47 @@
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import random
+import time
+import uuid
+
+# 本地桩服务：模仿 dashscope 文本生成接口（result_format='message'）的返回结构，
+# 用于在不消耗配额的情况下调试 re_api.py 的并发、限流与重试逻辑。
+# 用法：python re_api_stub.py，然后把 re_api.py 的 API_BASE_URL 设为 http://127.0.0.1:8000/api/v1
+HOST          = '127.0.0.1'
+PORT          = 8000
+LATENCY       = (0.2, 1.0)    # 每个请求的模拟延迟范围（秒）
+ERROR_RATE    = 0.1           # 随机返回 429 / 500 的比例，用于验证重试
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        time.sleep(random.uniform(*LATENCY))
+        request_id = str(uuid.uuid4())
+        if random.random() < ERROR_RATE:
+            status = random.choice([HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.INTERNAL_SERVER_ERROR])
+            payload = {'request_id': request_id, 'code': 'Throttling' if status == 429 else 'InternalError',
+                       'message': 'stub error'}
+        else:
+            status = HTTPStatus.OK
+            messages = body.get('input', {}).get('messages', [])
+            prompt = messages[-1]['content'] if messages else ''
+            payload = {'request_id': request_id,
+                       'output': {'choices': [{'finish_reason': 'stop',
+                                               'message': {'role': 'assistant',
+                                                           'content': 'stub answer for: ' + prompt[-30:]}}]},
+                       'usage': {'input_tokens': len(prompt), 'output_tokens': 8, 'total_tokens': len(prompt) + 8}}
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):            # 不逐条打印访问日志
+        pass
+
+
+if __name__ == '__main__':
+    print('stub server on http://%s:%d/api/v1' % (HOST, PORT))
+    ThreadingHTTPServer((HOST, PORT), StubHandler).serve_forever()
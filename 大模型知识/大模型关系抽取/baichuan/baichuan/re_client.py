@@ -0,0 +1,33 @@
+import json
+import urllib.request
+
+# re_server.py 的命令行客户端：输入一句话，逐 token 打印服务端返回的结果
+SERVER_URL = 'http://127.0.0.1:8600/generate'
+
+def stream(prompt, url=SERVER_URL, max_new_tokens=None):
+    # 逐段产出生成的文本；服务端报错时抛出 RuntimeError
+    body = {'prompt': prompt}
+    if max_new_tokens:
+        body['max_new_tokens'] = max_new_tokens
+    request = urllib.request.Request(url, data=json.dumps(body, ensure_ascii=False).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        for line in response:                           # 服务端每生成一段就发一行
+            item = json.loads(line)
+            if 'error' in item:
+                raise RuntimeError(item['error'])
+            yield item['token']
+
+def chat_loop(url=SERVER_URL):
+    while(True):
+        inputs=input("请输入：")
+        try:
+            for token in stream(inputs, url):
+                print(token, end='', flush=True)
+        except RuntimeError as exc:
+            print(exc, end='')
+        print()
+
+
+if __name__ == '__main__':
+    chat_loop()
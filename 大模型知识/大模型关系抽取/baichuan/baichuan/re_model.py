@@ -1,22 +1,171 @@
+import copy
+import inspect
+import itertools
+import json
+import os
 import torch
 from transformers import AutoModelForCausalLM, AutoTokenizer
 from transformers.generation.utils import GenerationConfig
-tokenizer = AutoTokenizer.from_pretrained("/data/huggingface/models/baichuan-inc_baichuan2-13b-chat", use_fast=False, trust_remote_code=True)
-model = AutoModelForCausalLM.from_pretrained("/data/huggingface/models/baichuan-inc_baichuan2-13b-chat", torch_dtype=torch.float16, trust_remote_code=True)
-# model = model.quantize(8).cuda() 
-model.generation_config = GenerationConfig.from_pretrained("/data/huggingface/models/baichuan-inc_baichuan2-13b-chat")
-with open('data.json', "r") as fh:
-    data = json.load(fh)
-result=[]
-print('read done')
-for sample in data:
-    text = sample['text']
-    prompt= "你是专门进行关系抽取的专家。请从 %s 中抽取关系三元组，请按照{头实体，关系，尾实体}的格式回答，候选关系有[导演，主演，编剧，时间]。" % (sample['text'])
-    messages = []
-    messages.append({"role": "user", "content": prompt})
-    response = model.chat(tokenizer, messages)
-    result.append({'text':text,
-                   'result':response})
-json_data = json.dumps(result,ensure_ascii=False, indent=4)
-with open("result.json", "w",encoding = 'utf-8') as file:
-    file.write(json_data)
\ No newline at end of file
+
+MODEL_PATH      = "/data/huggingface/models/baichuan-inc_baichuan2-13b-chat"
+DEVICE          = "cuda" if torch.cuda.is_available() else "cpu"   # 无 GPU 时在 CPU 上运行（测试时把 MODEL_PATH 换成小模型）
+QUANTIZE        = None        # 8 / 4：Baichuan2 自带的 model.quantize(bits)，仅 GPU 可用
+BATCH_SIZE      = 8           # 每次 generate 的样本数
+MAX_NEW_TOKENS  = 512         # 每个样本最多生成的 token 数
+INPUT_FILE      = 'data.json'
+OUTPUT_FILE     = 'result.jsonl'  # 每个 batch 完成后追加写入；重跑时跳过已完成的样本
+EXPORT_FILE     = 'result.json'   # 全部完成后按原始顺序导出为 [{text, result}]
+PROMPT_TEMPLATE = "你是专门进行关系抽取的专家。请从 %s 中抽取关系三元组，请按照{头实体，关系，尾实体}的格式回答，候选关系有[导演，主演，编剧，时间]。"
+# 前缀缓存：模板中 %s 之前的部分（连同对话标记）只编码一次，其 KV 缓存供所有样本复用，
+# 每个样本只需预填充 %s 及之后的 token。共享前缀越长收益越大，例如把候选关系放在文本之前：
+# PROMPT_TEMPLATE = "你是专门进行关系抽取的专家。请按照{头实体，关系，尾实体}的格式回答，候选关系有[导演，主演，编剧，时间]。请从以下文本中抽取关系三元组：%s"
+# 当前模板只能共享 “你是专门进行关系抽取的专家。请从 ” 十来个 token，默认关闭；
+# 模型不接受 position_ids 时（Baichuan2-13B 为 ALiBi），只把等长的后缀放进同一 batch
+PREFIX_CACHE    = False
+
+def load_model(path=MODEL_PATH, device=DEVICE):
+    tokenizer = AutoTokenizer.from_pretrained(path, use_fast=False, trust_remote_code=True)
+    dtype = torch.float16 if device == "cuda" else torch.float32  # CPU 不支持大部分 fp16 算子
+    model = AutoModelForCausalLM.from_pretrained(path, torch_dtype=dtype, trust_remote_code=True)
+    if QUANTIZE:
+        model = model.quantize(QUANTIZE)
+    model = model.to(device).eval()
+    if os.path.exists(os.path.join(path, "generation_config.json")):
+        model.generation_config = GenerationConfig.from_pretrained(path)
+    return tokenizer, model
+
+def _chat_pieces(tokenizer, model, prompt):
+    # 与 model.chat 相同的单轮对话输入，拆成 “特殊 token 列表 / 待编码文本” 片段：
+    # Baichuan2 为 <user> prompt <assistant>；其他模型用 tokenizer 的 chat_template，都没有时为 [BOS] prompt
+    config = model.generation_config
+    if getattr(config, "user_token_id", None) is not None:
+        return [[config.user_token_id], prompt, [config.assistant_token_id]]
+    if getattr(tokenizer, "chat_template", None):
+        return [tokenizer.apply_chat_template([{"role": "user", "content": prompt}],
+                                              tokenize=False, add_generation_prompt=True)]
+    return [tokenizer.encode("", add_special_tokens=True), prompt]
+
+def encode_chat(tokenizer, model, prompt, prefix=None):
+    # 返回输入 token 列表；给出 prefix（prompt 的开头部分）时返回 (前缀 ids, 其余 ids)，
+    # 前缀与其余部分分开编码，保证所有样本的前缀 ids 完全相同
+    before, after = [], []
+    target = before
+    for piece in _chat_pieces(tokenizer, model, prompt):
+        if isinstance(piece, list):
+            target += piece
+        elif prefix is not None and target is before:
+            at = piece.index(prefix) + len(prefix)
+            before += tokenizer.encode(piece[:at], add_special_tokens=False)
+            after  += tokenizer.encode(piece[at:], add_special_tokens=False)
+            target = after
+        else:
+            target += tokenizer.encode(piece, add_special_tokens=False)
+    return before if prefix is None else (before, after)
+
+def build_prefix_cache(model, prefix_ids):             # 共享前缀只前向一次，返回 (前缀 ids, KV 缓存)
+    with torch.no_grad():
+        out = model(input_ids=torch.tensor([prefix_ids], dtype=torch.long, device=model.device), use_cache=True)
+    return prefix_ids, out.past_key_values
+
+def _expand_cache(past, batch_size):                   # 把 batch=1 的前缀缓存复制成 batch_size 份
+    if hasattr(past, "batch_repeat_interleave"):       # transformers 的 Cache 对象会被原地更新，先拷贝
+        past = copy.deepcopy(past)
+        past.batch_repeat_interleave(batch_size)
+        return past
+    return tuple(tuple(t.expand(batch_size, *t.shape[1:]).contiguous() for t in layer) for layer in past)
+
+def accepts_position_ids(model):
+    # 旋转位置编码等模型可由 position_ids 让位置跳过填充；ALiBi 模型（Baichuan2-13B）没有这个参数，
+    # 前缀与后缀之间的填充会拉长两者的相对距离，输出随同 batch 的其他样本而变
+    return "position_ids" in inspect.signature(model.forward).parameters
+
+def generate_batch(tokenizer, model, batch_ids, max_new_tokens=MAX_NEW_TOKENS, prefix=None, streamer=None):
+    # batch_ids: 每个样本的输入 token 列表；左侧填充到同一长度后一次 generate
+    # prefix: build_prefix_cache 的返回值，此时 batch_ids 为前缀之后的部分，填充放在前缀与后缀之间
+    # streamer: 传给 generate 的流式回调（re_server.py 用它逐 token 返回）
+    if prefix and not accepts_position_ids(model) and len({len(ids) for ids in batch_ids}) > 1:
+        raise ValueError("prefix cache on a model without position_ids needs equal-length suffixes in a batch")
+    pad_id = tokenizer.pad_token_id
+    if pad_id is None:
+        pad_id = model.generation_config.pad_token_id or 0
+    prefix_ids = prefix[0] if prefix else []
+    P, width = len(prefix_ids), max(len(ids) for ids in batch_ids)
+    input_ids = torch.full((len(batch_ids), P + width), pad_id, dtype=torch.long)
+    input_ids[:, :P] = torch.tensor(prefix_ids, dtype=torch.long)
+    attention_mask = torch.zeros_like(input_ids)
+    attention_mask[:, :P] = 1
+    for i, ids in enumerate(batch_ids):                 # 左填充：各样本的最后一个输入 token 对齐
+        input_ids[i, P + width - len(ids):] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[i, P + width - len(ids):] = 1
+    input_ids, attention_mask = input_ids.to(model.device), attention_mask.to(model.device)
+    config = copy.deepcopy(model.generation_config)    # 沿用模型的采样参数，只改生成长度与填充 id
+    config.max_new_tokens, config.pad_token_id = max_new_tokens, pad_id
+    kwargs = {"streamer": streamer} if streamer is not None else {}
+    with torch.no_grad():
+        if prefix:
+            # 预填充：后缀除最后一个 token 外接在共享前缀的缓存后面前向一次；
+            # generate 看到缓存只差最后一个 token，只会再计算这一个位置
+            past = _expand_cache(prefix[1], len(batch_ids))
+            if width > 1:
+                extra = {}
+                if accepts_position_ids(model):           # 位置跳过填充；无此参数时 batch 内后缀等长，没有填充
+                    extra["position_ids"] = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, P:-1]
+                past = model(input_ids=input_ids[:, P:-1], attention_mask=attention_mask[:, :-1],
+                             past_key_values=past, use_cache=True, **extra).past_key_values
+            kwargs["past_key_values"] = past
+        output = model.generate(input_ids=input_ids, attention_mask=attention_mask,
+                                generation_config=config, **kwargs)
+    return [tokenizer.decode(row[P + width:], skip_special_tokens=True) for row in output.tolist()]
+
+def load_done(path):                                    # 已完成样本的下标（断点续跑）
+    done = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    record = json.loads(line)
+                    done[record['idx']] = record['result']
+    return done
+
+
+if __name__ == '__main__':
+    tokenizer, model = load_model()
+    with open(INPUT_FILE, "r", encoding='utf-8') as fh:
+        data = json.load(fh)
+    print('read done')
+    done = load_done(OUTPUT_FILE)
+    head = PROMPT_TEMPLATE.split('%s')[0]               # 所有样本共享的前缀文本
+    prefix = None
+    if PREFIX_CACHE and head:
+        encoded = {}
+        for i, sample in enumerate(data):
+            if i not in done:
+                prefix_ids, encoded[i] = encode_chat(tokenizer, model, PROMPT_TEMPLATE % (sample['text']), prefix=head)
+        if encoded:
+            prefix = build_prefix_cache(model, prefix_ids)
+            print(f'prefix cached: {len(prefix_ids)} tokens')
+    else:
+        encoded = {i: encode_chat(tokenizer, model, PROMPT_TEMPLATE % (sample['text']))
+                   for i, sample in enumerate(data) if i not in done}
+    # 按输入长度排序后切成 batch：同一 batch 内长度接近，填充最少
+    order = sorted(encoded, key=lambda i: len(encoded[i]))
+    if prefix and not accepts_position_ids(model):      # 前缀缓存 + ALiBi：只把等长后缀放进同一 batch，不留填充
+        batches = []
+        for _, group in itertools.groupby(order, key=lambda i: len(encoded[i])):
+            group = list(group)
+            batches += [group[start:start + BATCH_SIZE] for start in range(0, len(group), BATCH_SIZE)]
+    else:
+        batches = [order[start:start + BATCH_SIZE] for start in range(0, len(order), BATCH_SIZE)]
+    num_batches = len(batches)
+    with open(OUTPUT_FILE, "a", encoding='utf-8') as out:
+        for b, batch in enumerate(batches, 1):
+            responses = generate_batch(tokenizer, model, [encoded[i] for i in batch], prefix=prefix)
+            for i, response in zip(batch, responses):
+                out.write(json.dumps({'idx': i, 'text': data[i]['text'], 'result': response}, ensure_ascii=False) + '\n')
+                done[i] = response
+            out.flush()
+            print(f'batch {b}/{num_batches} | size:{len(batch)} input_len:{len(encoded[batch[-1]])}')
+    result = [{'text': sample['text'], 'result': done[i]} for i, sample in enumerate(data) if i in done]
+    json_data = json.dumps(result,ensure_ascii=False, indent=4)
+    with open(EXPORT_FILE, "w",encoding = 'utf-8') as file:
+        file.write(json_data)
@@ -0,0 +1,189 @@
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import functools
+import json
+import queue
+import sys
+import threading
+import time
+
+# 常驻推理服务：模型只加载一次，多个客户端（re_client.py / re_model_input.py / re_api_input.py）共用。
+#   model 后端：各连接的请求进入队列，在 BATCH_WINDOW 时间窗内凑成不超过 MAX_BATCH 的小批量，
+#               用 re_model.generate_batch 一起生成，每步新 token 立即按请求分发回去；
+#   api   后端：转发给 dashscope 的流式接口，所有客户端共用 re_api 的令牌桶限流。
+# 接口：POST /generate  {"prompt": "...", "max_new_tokens": 512}
+# 返回：分块传输的 JSON-lines，逐行为 {"token": "..."}，出错为 {"error": "..."}，连接结束即生成结束。
+# 用法：python re_server.py [model|api]
+HOST           = '127.0.0.1'
+PORTS          = {'model': 8600, 'api': 8601}
+BACKEND        = 'model'
+MAX_BATCH      = 8            # 每个小批量最多合并的请求数
+BATCH_WINDOW   = 0.05         # 第一个请求到达后最多再等待的秒数，用于凑批
+MAX_NEW_TOKENS = 512          # 默认值，也是单个请求可要求的上限（同批请求按最长的生成）
+
+class Request:
+    __slots__ = ('prompt', 'max_new_tokens', 'ids', 'out')
+
+    def __init__(self, prompt, max_new_tokens):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.ids = None                                # model 后端：入队前编码好的输入 token
+        self.out = queue.Queue()                       # 生成线程 → HTTP 线程：{"token"}/{"error"}，None 表示结束
+
+pending = queue.Queue()
+encoder = None                                         # model 后端：prompt → 输入 token，启动时设置
+
+# --------------------------- model 后端：小批量生成 ---------------------------
+def make_streamer(tokenizer, model, batch):
+    from transformers.generation.streamers import BaseStreamer
+
+    eos = model.generation_config.eos_token_id
+    eos = set(eos if isinstance(eos, list) else [eos])
+
+    class BatchStreamer(BaseStreamer):
+        # generate 每步调用 put(新 token)；按行累积并增量解码，只把新增的完整字符发给对应请求
+        def __init__(self):
+            self.tokens = [[] for _ in batch]
+            self.sent = [0] * len(batch)
+            self.finished = [False] * len(batch)
+            self.prompt_seen = False
+
+        def _flush(self, i):
+            text = tokenizer.decode(self.tokens[i], skip_special_tokens=True)
+            if text.endswith('\ufffd'):                # 多字节字符尚未完整，等下一个 token
+                return
+            if len(text) > self.sent[i]:
+                batch[i].out.put({'token': text[self.sent[i]:]})
+                self.sent[i] = len(text)
+
+        def put(self, value):
+            if not self.prompt_seen:                   # 第一次调用传入的是输入 prompt
+                self.prompt_seen = True
+                return
+            for i, token in enumerate(value.reshape(len(batch), -1)[:, -1].tolist()):
+                if self.finished[i]:
+                    continue
+                if token in eos or len(self.tokens[i]) >= batch[i].max_new_tokens:
+                    self.finished[i] = True
+                    continue
+                self.tokens[i].append(token)
+                self._flush(i)
+
+        def end(self):
+            for i in range(len(batch)):
+                self._flush(i)
+
+    return BatchStreamer()
+
+def batch_loop(tokenizer, model):
+    from re_model import generate_batch
+
+    while True:
+        batch = [pending.get()]
+        deadline = time.monotonic() + BATCH_WINDOW
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        try:
+            generate_batch(tokenizer, model, [r.ids for r in batch],
+                           max_new_tokens=max(r.max_new_tokens for r in batch),
+                           streamer=make_streamer(tokenizer, model, batch))
+        except Exception as exc:                       # 单个批次失败不影响服务
+            for r in batch:
+                r.out.put({'error': repr(exc)})
+        finally:
+            for r in batch:
+                r.out.put(None)
+
+# --------------------------- api 后端：转发流式接口 ---------------------------
+def api_stream(request):
+    import dashscope
+    import re_api
+
+    try:
+        re_api.bucket.acquire()
+        responses = dashscope.Generation.call(
+            re_api.MODEL,
+            messages=[{'role': 'user', 'content': request.prompt}],
+            result_format='message',
+            stream=True,
+            incremental_output=True,                   # 每次只返回新增的文本
+            max_tokens=request.max_new_tokens,
+        )
+        for response in responses:
+            if response.status_code == HTTPStatus.OK:
+                request.out.put({'token': response.output.choices[0].message.content})
+            else:
+                request.out.put({'error': 'Request id: %s, Status code: %s, error code: %s, error message: %s' % (
+                    response.request_id, response.status_code, response.code, response.message)})
+                break
+    except Exception as exc:
+        request.out.put({'error': repr(exc)})
+    finally:
+        request.out.put(None)
+
+# --------------------------- HTTP 服务 ----------------------------------------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'                      # 分块传输需要 HTTP/1.1
+
+    def _chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path != '/generate':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if not isinstance(body['prompt'], str):
+                raise TypeError('prompt must be a string')
+            max_new_tokens = min(max(int(body.get('max_new_tokens', MAX_NEW_TOKENS)), 1), MAX_NEW_TOKENS)
+            request = Request(body['prompt'], max_new_tokens)
+        except (ValueError, KeyError, TypeError):
+            self.send_error(HTTPStatus.BAD_REQUEST, 'expected JSON {"prompt": "...", "max_new_tokens": int}')
+            return
+        if BACKEND == 'model':
+            try:                                       # 入队前编码：编码失败只影响本请求，不拖垮同批的其他请求
+                request.ids = encoder(request.prompt)
+            except Exception as exc:
+                self.send_error(HTTPStatus.BAD_REQUEST, 'cannot encode prompt: %r' % exc)
+                return
+            pending.put(request)
+        else:
+            threading.Thread(target=api_stream, args=(request,), daemon=True).start()
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            while True:
+                item = request.out.get()
+                if item is None:
+                    break
+                self._chunk(json.dumps(item, ensure_ascii=False) + '\n')
+            self._chunk('')                            # 结束块
+        except (BrokenPipeError, ConnectionResetError):  # 客户端提前断开，生成结果直接丢弃
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        BACKEND = sys.argv[1]
+    if BACKEND == 'model':
+        from re_model import encode_chat, load_model
+        tokenizer, model = load_model()                # 只在启动时加载一次
+        encoder = functools.partial(encode_chat, tokenizer, model)
+        threading.Thread(target=batch_loop, args=(tokenizer, model), daemon=True).start()
+    print('%s server on http://%s:%d/generate' % (BACKEND, HOST, PORTS[BACKEND]))
+    ThreadingHTTPServer((HOST, PORTS[BACKEND]), Handler).serve_forever()